@@ -8,7 +8,51 @@ DATA_DIR = BASE_DIR / "data"
 DRUG_INTERACTIONS_FILE = DATA_DIR / "db_drug_interactions.csv"
 MEDICINE_DETAILS_FILE = DATA_DIR / "Medicine_Details.csv"
 
+# Processed Wikipedia articles, summaries and the binary chunk store
+WIKIPEDIA_DATA_DIR = DATA_DIR / "medical_wikipedia_data"
+
+# Wikipedia ZIM served directly, without extraction, by GET /wikipedia/article (app/services/zim_articles.py).
+# Decompressed clusters and cleaned articles are kept in LRU caches bounded by these sizes.
+ZIM_FILE = Path(os.environ.get("MEDIGUIDE_ZIM_FILE", str(DATA_DIR / "wikipedia_en_medicine_mini_2025-08.zim")))
+ZIM_CLUSTER_CACHE_MB = int(os.environ.get("MEDIGUIDE_ZIM_CLUSTER_CACHE_MB", "64"))
+ZIM_ARTICLE_CACHE_MB = int(os.environ.get("MEDIGUIDE_ZIM_ARTICLE_CACHE_MB", "16"))
+
+# Shared, memory-mapped index segments used by multi-worker deployments (see app/serve.py)
+SHARED_INDEX_DIR_ENV = "MEDIGUIDE_INDEX_DIR"
+SHARED_INDEX_DIR = DATA_DIR / "index"
+
+# Storage backend: "memory" (pandas-loaded arrays) or "sqlite" (prebuilt database file, see
+# app/services/sqlite_backend.py) for devices that cannot hold the catalogue in RAM
+STORAGE_BACKEND = os.environ.get("MEDIGUIDE_STORAGE_BACKEND", "memory")
+SQLITE_DB_FILE = DATA_DIR / "mediguide.db"
+SQLITE_CACHE_KB = int(os.environ.get("MEDIGUIDE_SQLITE_CACHE_KB", "8192"))
+SQLITE_MMAP_BYTES = int(os.environ.get("MEDIGUIDE_SQLITE_MMAP_BYTES", str(64 * 1024 * 1024)))
+
+# Versioned, sharded search index the frontend downloads for offline lookups (served under /static/bundle)
+STATIC_BUNDLE_DIR = BASE_DIR.parent / "frontend" / "bundle"
+
+# On-demand request profiling (app/utils/profiling.py). Requests sent with "X-Profile: <token>" are
+# profiled, and /admin/profiling needs "X-Admin-Token: <token>"; with no token set profiling is off.
+PROFILE_TOKEN = os.environ.get("MEDIGUIDE_PROFILE_TOKEN")
+PROFILE_DIR = DATA_DIR / "profiles"
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get("MEDIGUIDE_PROFILE_INTERVAL_MS", "1"))
+PROFILE_KEEP = 200
+
 # Model settings
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 EMBEDDING_DIM = 384
+# Generative backend for questions the knowledge base cannot answer (app/models/llm_backends.py):
+# "none", "stub" (deterministic, for tests), "litellm" or "transformers" (local CPU model)
+LLM_BACKEND = os.environ.get("MEDIGUIDE_LLM_BACKEND", "none")
+LLM_MODEL_NAME = os.environ.get("MEDIGUIDE_LLM_MODEL")
+LLM_MAX_NEW_TOKENS = 256
+LLM_STUB_LATENCY_MS = float(os.environ.get("MEDIGUIDE_LLM_STUB_LATENCY_MS", "50"))
+# Dynamic batching of concurrent /ask-mediguide generations (app/services/llm_scheduler.py)
+LLM_BATCH_WINDOW_MS = float(os.environ.get("MEDIGUIDE_LLM_BATCH_WINDOW_MS", "10"))
+LLM_MAX_QUEUE = int(os.environ.get("MEDIGUIDE_LLM_MAX_QUEUE", "64"))
+LLM_REQUEST_TIMEOUT_S = float(os.environ.get("MEDIGUIDE_LLM_REQUEST_TIMEOUT_S", "30"))
+
+# Wikipedia chunks are sized in the embedder's tokens; all-MiniLM-L6-v2 truncates input past 256
+CHUNK_MAX_TOKENS = 256
+CHUNK_OVERLAP_TOKENS = 32
 SIMILARITY_THRESHOLD = 0.7
\ No newline at end of file
@@ -3,9 +3,12 @@ import logging
 import warnings
 import traceback
 import json
-from fastapi import FastAPI, HTTPException, Query, Body
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, Query, Body, Depends, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from pathlib import Path
 from typing import List, Optional
 import uvicorn
 
@@ -17,15 +20,26 @@ logger = logging.getLogger(__name__)
 warnings.filterwarnings("ignore", message="libuv only supports millisecond timer resolution")
 
 
+from app.config import PROFILE_TOKEN, SHARED_INDEX_DIR_ENV, WIKIPEDIA_DATA_DIR, ZIM_FILE
 from app.utils.zim_processor import process_medical_wikipedia
 from app.models.drug_model import (
-    Medicine, DrugInteraction, InteractionRequest, 
+    Medicine, MedicineDetail, DrugInteraction, InteractionRequest, 
     InteractionResponse, MedicineSearchRequest, MedicineSearchResponse,
-    MediGuideRequest
+    MediGuideRequest, InteractionTemplate, SeverityLevel,
+    AlternativesRequest, AlternativesResponse, ProfilingSettings, WikipediaArticle
 )
 from app.services.data_loader import data_loader
 from app.services.interaction_service import interaction_service
+from app.services.alternative_service import alternative_service
+from app.services.readiness import readiness
+from app.services.static_bundle import ensure_bundle
+from app.services.wiki_linker import wiki_linker
+from app.services.zim_articles import zim_article_service
 from app.models.llm_model import llm_model
+from app.services.llm_scheduler import DeadlineExceededError, QueueFullError, llm_scheduler
+from app.utils.http_cache import ResponseCache
+from app.utils.chunk_store import ChunkStore
+from app.utils.profiling import ProfilingMiddleware, request_profiler
 
 app = FastAPI(
     title="Drug Interaction API",
@@ -42,39 +56,114 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in per-request profiling (X-Profile header or /admin/profiling); a header check when off
+app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+
 # Serve static files from the frontend directory
 app.mount("/static", StaticFiles(directory="frontend", html=True), name="static")
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize application on startup"""
+# Subsystems loaded in the background at startup; endpoints answer 503 until theirs is ready
+readiness.register("medicines", "interactions", "knowledge_base", "llm", "alternatives", "static_bundle",
+                   "wikipedia", "wiki_links")
+REQUIRED_SUBSYSTEMS = ("medicines", "interactions", "knowledge_base")
+startup_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup")
+wikipedia_stats = {"chunks_loaded": 0}
+# ETags, 304s and pre-compressed bodies for GET endpoints that only change with the CSVs (and, for
+# medicine details, the Wikipedia links, whose version is appended once they load)
+response_cache = ResponseCache(lambda: (
+    f"{data_loader.dataset_version}-{wiki_linker.version}" if wiki_linker.version else data_loader.dataset_version,
+    max(data_loader.data_modified, wiki_linker.modified)
+))
+
+def _load_data_and_llm():
+    """Load both datasets (in parallel), then build what depends on them"""
     try:
-        # Load data
-        data_loader.load_data()
-        
-        # Initialize LLM with medicine names
-        medicine_names = [med.name for med in data_loader.medicines]
-        llm_model.load_model()
-        llm_model.index_medicines(medicine_names)
-        
-        # Load medical knowledge base for solution-focused responses
-        llm_model.load_medical_knowledge_base()
-        
-        logger.info("Application started successfully")
+        # Load data, or attach to segments already built by the app.serve parent process
+        shared_index_dir = os.environ.get(SHARED_INDEX_DIR_ENV)
+        if shared_index_dir:
+            data_loader.attach(Path(shared_index_dir))
+        else:
+            data_loader.load_data()
     except Exception as e:
         logger.error(f"Startup error: {e}")
-        raise
+        # Nothing built from the data can load now; give it a terminal state instead of leaving it pending
+        for name in ("medicines", "interactions", "alternatives", "static_bundle", "wiki_links", "llm"):
+            if not readiness.is_ready(name):
+                readiness.fail(name, e)
+        return
+
+    readiness.run("alternatives", alternative_service.build)
+    if shared_index_dir:
+        # With shared segments the app.serve parent has already exported the bundle
+        readiness.disable("static_bundle", "exported by the app.serve parent")
+    else:
+        readiness.run("static_bundle", ensure_bundle, data_loader.medicines, data_loader.drug_interactions)
+    # Medicine details embed Wikipedia references once this is ready; links are rebuilt if stale
+    if wiki_linker.available():
+        readiness.run("wiki_links", wiki_linker.load)
+    else:
+        readiness.disable("wiki_links", f"no Wikipedia summaries in {WIKIPEDIA_DATA_DIR}; run POST /process-wikipedia")
+
+    def load_llm():
+        llm_model.load_model()
+        llm_model.index_medicines(data_loader.medicines.names())
+
+    readiness.run("llm", load_llm)
+
+def _load_knowledge_base():
+    if not llm_model.load_medical_knowledge_base():
+        raise RuntimeError("medical knowledge base failed to load")
+
+def _load_wikipedia_stats():
+    # The chunk store's index header holds the count, so no chunk text is read
+    if ChunkStore.exists(WIKIPEDIA_DATA_DIR):
+        wikipedia_stats["chunks_loaded"] = ChunkStore.count(WIKIPEDIA_DATA_DIR)
+        return
+    # Stores written before the binary format
+    try:
+        with open(WIKIPEDIA_DATA_DIR / "medical_chunks.json", 'r', encoding='utf-8') as f:
+            medical_chunks = json.load(f)
+        wikipedia_stats["chunks_loaded"] = len(medical_chunks)
+    except FileNotFoundError:
+        wikipedia_stats["chunks_loaded"] = 0
+
+@app.on_event("startup")
+async def startup_event():
+    """Start loading subsystems in the background so the server accepts traffic immediately"""
+    llm_scheduler.start()
+    startup_executor.submit(_load_data_and_llm)
+    startup_executor.submit(readiness.run, "knowledge_base", _load_knowledge_base)
+    # Optional and slow; only /health reports it
+    startup_executor.submit(readiness.run, "wikipedia", _load_wikipedia_stats)
+    logger.info("Application started, loading subsystems in the background")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await llm_scheduler.stop()
 
 @app.get("/")
 async def root():
     return {"message": "Drug Interaction API is running"}
 
-@app.get("/medicines", response_model=List[Medicine])
-async def get_all_medicines(limit: int = Query(100, ge=1, le=1000)):
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once every required subsystem has loaded, 503 before"""
+    is_ready = readiness.are_ready(*REQUIRED_SUBSYSTEMS)
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "subsystems": readiness.snapshot()}
+    )
+
+@app.get("/medicines", response_model=List[Medicine],
+         dependencies=[Depends(readiness.require("medicines"))])
+async def get_all_medicines(request: Request, limit: int = Query(100, ge=1, le=1000)):
     """Get all medicines with optional limit"""
-    return data_loader.medicines[:limit]
+    return response_cache.respond(
+        request, lambda: [record.to_model() for record in data_loader.medicines[:limit]]
+    )
 
-@app.post("/medicines/search", response_model=MedicineSearchResponse)
+@app.post("/medicines/search", response_model=MedicineSearchResponse,
+         dependencies=[Depends(readiness.require("medicines"))])
 async def search_medicines(request: MedicineSearchRequest):
     """Search medicines by name or generic name"""
     results = data_loader.search_medicines(request.query, request.limit)
@@ -83,73 +172,163 @@ async def search_medicines(request: MedicineSearchRequest):
         total_count=len(results)
     )
 
-@app.get("/medicines/{medicine_name}", response_model=Medicine)
-async def get_medicine(medicine_name: str):
-    """Get medicine details by name"""
-    medicine = data_loader.get_medicine_by_name(medicine_name)
-    if not medicine:
-        raise HTTPException(status_code=404, detail="Medicine not found")
-    return medicine
+@app.get("/medicines/autocomplete", response_model=List[str],
+         dependencies=[Depends(readiness.require("medicines"))])
+async def autocomplete_medicines(prefix: str = Query(..., min_length=1, max_length=100),
+                                 limit: int = Query(8, ge=1, le=50)):
+    """Medicine names starting with a prefix, small enough to request on every keystroke"""
+    return data_loader.autocomplete_medicines(prefix, limit)
+
+@app.get("/medicines/{medicine_name}", response_model=MedicineDetail,
+         dependencies=[Depends(readiness.require("medicines"))])
+async def get_medicine(request: Request, medicine_name: str):
+    """Get medicine details by name, with Wikipedia summaries of its ingredients once linked"""
+    def produce():
+        medicine = data_loader.get_medicine_by_name(medicine_name)
+        if not medicine:
+            raise HTTPException(status_code=404, detail="Medicine not found")
+        return MedicineDetail(**medicine.model_dump(), references=wiki_linker.references(medicine.generic_name))
+    return response_cache.respond(request, produce)
 
-@app.post("/interactions/check", response_model=InteractionResponse)
+@app.post("/interactions/check", response_model=InteractionResponse,
+         dependencies=[Depends(readiness.require("interactions"))])
 async def check_interactions(request: InteractionRequest):
     """Check interactions between multiple medicines"""
     return interaction_service.check_interactions(request)
 
-@app.get("/interactions/{drug_a}/{drug_b}", response_model=List[DrugInteraction])
-async def get_interaction(drug_a: str, drug_b: str):
+@app.post("/interactions/alternatives", response_model=AlternativesResponse,
+         dependencies=[Depends(readiness.require("alternatives"))])
+async def find_alternatives(request: AlternativesRequest):
+    """Suggest same-composition or same-use substitutes that interact least with the rest of a regimen"""
+    return alternative_service.find_alternatives(request)
+
+@app.get("/interactions/templates", response_model=List[InteractionTemplate],
+         dependencies=[Depends(readiness.require("interactions"))])
+async def get_interaction_templates(contains: Optional[str] = Query(None)):
+    """List interaction description templates, optionally filtered by text"""
+    return data_loader.get_interaction_templates(contains)
+
+@app.get("/interactions/templates/{template_id}", response_model=List[DrugInteraction],
+         dependencies=[Depends(readiness.require("interactions"))])
+async def get_interactions_by_template(template_id: int, limit: int = Query(100, ge=1, le=1000)):
+    """Get interactions whose description follows a template"""
+    if not 0 <= template_id < len(data_loader.drug_interactions.templates):
+        raise HTTPException(status_code=404, detail="Template not found")
+    return data_loader.find_interactions_by_template(template_id, limit)
+
+@app.get("/interactions/{drug_a}/{drug_b}", response_model=List[DrugInteraction],
+         dependencies=[Depends(readiness.require("interactions"))])
+async def get_interaction(request: Request, drug_a: str, drug_b: str,
+                          min_severity: Optional[SeverityLevel] = Query(None)):
     """Get specific interaction between two drugs"""
-    interactions = data_loader.find_interactions([drug_a, drug_b])
-    if not interactions:
-        raise HTTPException(status_code=404, detail="No interactions found")
-    return interactions
+    def produce():
+        interactions = data_loader.find_interactions([drug_a, drug_b], min_severity=min_severity)
+        if not interactions:
+            raise HTTPException(status_code=404, detail="No interactions found")
+        return interactions
+    return response_cache.respond(request, produce)
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    wikipedia_data_exists = os.path.exists("app/data/wikipedia_en_medicine_mini_2025-08.zim")
-    
-    # Load medical chunks to check how many are available
-    try:
-        with open("app/data/medical_wikipedia_data/medical_chunks.json", 'r', encoding='utf-8') as f:
-            medical_chunks = json.load(f)
-        chunks_loaded = len(medical_chunks)
-    except FileNotFoundError:
-        chunks_loaded = 0
+    wikipedia_data_exists = ZIM_FILE.exists()
     
     return {
-        "status": "healthy",
+        "status": "healthy" if readiness.are_ready(*REQUIRED_SUBSYSTEMS) else "starting",
+        "subsystems": readiness.snapshot(),
         "medicines_loaded": len(data_loader.medicines),
         "interactions_loaded": len(data_loader.drug_interactions),
         "model_loaded": llm_model.model is not None,
         "wikipedia_data_available": wikipedia_data_exists,
-        "wikipedia_data_path": "app/data/wikipedia_en_medicine_mini_2025-08.zim",
-        "wikipedia_chunks_loaded": chunks_loaded
+        "wikipedia_data_path": str(ZIM_FILE),
+        "wikipedia_chunks_loaded": wikipedia_stats["chunks_loaded"],
+        "memory": data_loader.memory_report(),
+        "response_cache": response_cache.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "zim_articles": zim_article_service.stats()
     }
 
 
-@app.post("/ask-mediguide")
+@app.get("/wikipedia/article", response_model=WikipediaArticle)
+def get_wikipedia_article(title: Optional[str] = Query(None, min_length=1, max_length=300),
+                          article_id: Optional[int] = Query(None, ge=0)):
+    """Read a Wikipedia article straight from the ZIM file, by title, URL or article id
+
+    A plain def, so cluster decompression runs in the thread pool rather than on the event loop.
+    """
+    if (title is None) == (article_id is None):
+        raise HTTPException(status_code=422, detail="Give exactly one of title or article_id")
+    try:
+        article = zim_article_service.get(title=title, article_id=article_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if article is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+    return article
+
+
+@app.post("/ask-mediguide", dependencies=[Depends(readiness.require("knowledge_base"))])
 async def ask_mediguide(request: MediGuideRequest = Body(...)):
     """Ask medical questions to MediGuide for solution-focused responses"""
     try:
         question = request.question
 
-        # Generate solution-focused response using the medical knowledge base
-        response = llm_model.generate_solution_response(question)
+        # Emergencies and known conditions are answered from the medical knowledge base
+        response = llm_model.find_solution(question)
+        source = "knowledge_base"
+
+        # Anything else goes to the generative backend, batched with concurrent questions
+        if response is None and llm_model.use_llm and readiness.is_ready("llm"):
+            try:
+                response = await llm_scheduler.submit(question)
+                source = "llm"
+            except QueueFullError:
+                raise HTTPException(status_code=503, detail="MediGuide is busy, try again shortly",
+                                    headers={"Retry-After": "1"})
+            except DeadlineExceededError:
+                raise HTTPException(status_code=504, detail="MediGuide took too long to answer")
+            except Exception as e:
+                logger.warning(f"LLM generation failed, answering from the knowledge base: {e}")
+
+        if response is None:
+            response = llm_model.generate_solution_response(question)
 
         return {
             "question": question,
             "response": response,
+            "source": source,
             "success": True
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating response: {e}")
         raise HTTPException(status_code=500, detail="Error generating response")
 
+def _require_admin(request: Request):
+    """Admin endpoints are only reachable with X-Admin-Token set to MEDIGUIDE_PROFILE_TOKEN"""
+    if not PROFILE_TOKEN or request.headers.get("x-admin-token") != PROFILE_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.get("/admin/profiling", dependencies=[Depends(_require_admin)])
+async def get_profiling():
+    """Current profiling settings and the most recent stored profiles"""
+    return {**request_profiler.state(), "recent": request_profiler.recent()}
+
+@app.post("/admin/profiling", dependencies=[Depends(_require_admin)])
+async def set_profiling(settings: ProfilingSettings):
+    """Profile a fraction of requests to the given path prefixes; sample_rate 0 turns sampling off"""
+    request_profiler.configure(settings.sample_rate, settings.paths)
+    logger.info(f"Request profiling: sample_rate={settings.sample_rate} paths={settings.paths}")
+    return request_profiler.state()
+
 @app.post("/process-wikipedia")
 async def process_wikipedia_data():
     try:
         result = process_medical_wikipedia()
+        if result.get("status") == "success" and readiness.is_ready("medicines"):
+            # Link medicines to the new summaries without a restart
+            startup_executor.submit(readiness.run, "wiki_links", wiki_linker.load)
         return result
     except Exception as e:
         logger.error(f"Error processing Wikipedia data: {e}")
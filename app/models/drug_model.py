@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, Literal
+
+SeverityLevel = Literal["unknown", "low", "moderate", "high"]
 
 class Medicine(BaseModel):
     medicine_id: str
@@ -12,6 +14,25 @@ class Medicine(BaseModel):
     side_effects: Optional[str] = None
     precautions: Optional[str] = None
 
+class WikipediaReference(BaseModel):
+    article_id: int
+    title: str
+    url: str
+    summary: str
+    ingredient: str
+    score: int
+
+class MedicineDetail(Medicine):
+    references: List[WikipediaReference] = []
+
+class WikipediaArticle(BaseModel):
+    article_id: int
+    title: str
+    url: str
+    content: str
+    length: int
+    redirected_from: Optional[str] = None
+
 class DrugInteraction(BaseModel):
     drug_a: str
     drug_b: str
@@ -19,10 +40,19 @@ class DrugInteraction(BaseModel):
     description: str
     severity: str
     recommendations: Optional[str] = None
+    template_id: Optional[int] = None
+
+class InteractionTemplate(BaseModel):
+    template_id: int
+    text: str
+    interaction_count: int
 
 class InteractionRequest(BaseModel):
     medicines: List[str]
     patient_info: Optional[Dict[str, Any]] = None
+    min_severity: Optional[SeverityLevel] = None
+    sort_by_severity: bool = False
+    limit: Optional[int] = Field(None, ge=1)
 
 class InteractionResponse(BaseModel):
     interactions: List[DrugInteraction]
@@ -37,5 +67,28 @@ class MedicineSearchResponse(BaseModel):
     medicines: List[Medicine]
     total_count: int
 
+class AlternativesRequest(BaseModel):
+    medicines: List[str]
+    replace: str
+    limit: int = Field(10, ge=1)
+
+class Alternative(BaseModel):
+    name: str
+    generic_name: Optional[str] = None
+    uses: Optional[str] = None
+    match: str
+    interaction_count: int
+    conflicting_with: List[str]
+    ingredients_checked: bool
+
+class AlternativesResponse(BaseModel):
+    replace: str
+    current_interaction_count: int
+    alternatives: List[Alternative]
+
 class MediGuideRequest(BaseModel):
     question: str
+
+class ProfilingSettings(BaseModel):
+    sample_rate: float = Field(0.0, ge=0.0, le=1.0)
+    paths: List[str] = ["/"]
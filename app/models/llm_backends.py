@@ -0,0 +1,155 @@
+import hashlib
+import logging
+import time
+from typing import List, Optional
+
+from app.config import LLM_MAX_NEW_TOKENS, LLM_MODEL_NAME, LLM_STUB_LATENCY_MS
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are MediGuide, an offline medical assistant. Answer the question briefly and plainly, "
+    "and remind the user to consult a healthcare professional for personal advice."
+)
+
+
+class LLMBackend:
+    """A text generator that answers a whole batch of prompts in one call
+
+    Backends are loaded once in the background and then only called from the
+    batch scheduler's single worker thread, so they need not be thread-safe.
+    """
+
+    name = "base"
+    # Largest batch one generate_batch call should get
+    max_batch_size = 8
+
+    def load(self):
+        """Load weights or check connectivity; raise if the backend cannot serve"""
+
+    def generate_batch(self, prompts: List[str], max_new_tokens: int = LLM_MAX_NEW_TOKENS) -> List[str]:
+        raise NotImplementedError
+
+
+class StubBackend(LLMBackend):
+    """Deterministic stand-in model for tests and load tests
+
+    The answer depends only on the prompt. Each call sleeps a fixed latency_ms
+    plus a small per-prompt cost, like a forward pass, so batching is measurable.
+    """
+
+    name = "stub"
+    max_batch_size = 16
+
+    _WORDS = ("rest", "hydrate", "monitor", "symptoms", "dosage", "consult", "doctor", "pharmacist",
+              "avoid", "alcohol", "food", "daily", "relief", "medication", "interaction", "advice")
+
+    def __init__(self, latency_ms: float = LLM_STUB_LATENCY_MS, per_prompt_ms: float = 1.0):
+        self.latency_ms = latency_ms
+        self.per_prompt_ms = per_prompt_ms
+
+    def generate_batch(self, prompts: List[str], max_new_tokens: int = LLM_MAX_NEW_TOKENS) -> List[str]:
+        time.sleep((self.latency_ms + self.per_prompt_ms * len(prompts)) / 1000)
+        return [self._answer(prompt, max_new_tokens) for prompt in prompts]
+
+    def _answer(self, prompt: str, max_new_tokens: int) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        words = [self._WORDS[byte % len(self._WORDS)] for byte in digest[:min(max_new_tokens, 24)]]
+        return f"[stub] {' '.join(words)}."
+
+
+class LiteLLMBackend(LLMBackend):
+    """Any model litellm can reach, e.g. a local Ollama server ("ollama/llama3") or a hosted API"""
+
+    name = "litellm"
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model or LLM_MODEL_NAME or "gpt-3.5-turbo"
+        self._litellm = None
+
+    def load(self):
+        # litellm is slow to import; only pay for it when this backend is selected
+        import litellm
+        self._litellm = litellm
+
+    def generate_batch(self, prompts: List[str], max_new_tokens: int = LLM_MAX_NEW_TOKENS) -> List[str]:
+        responses = self._litellm.batch_completion(
+            model=self.model,
+            messages=[[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+                      for prompt in prompts],
+            max_tokens=max_new_tokens
+        )
+        answers = []
+        for response in responses:
+            if isinstance(response, Exception):
+                raise response
+            answers.append(response.choices[0].message.content.strip())
+        return answers
+
+
+class TransformersBackend(LLMBackend):
+    """Small instruction-tuned causal LM run locally on CPU with Hugging Face transformers
+
+    A batch is left-padded into one tensor so the whole batch is a single generate() call.
+    """
+
+    name = "transformers"
+    max_batch_size = 8
+
+    def __init__(self, model_name: Optional[str] = None, threads: Optional[int] = None):
+        self.model_name = model_name or LLM_MODEL_NAME or "Qwen/Qwen2.5-0.5B-Instruct"
+        self.threads = threads
+        self.tokenizer = None
+        self.model = None
+        self._torch = None
+
+    def load(self):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name, padding_side="left")
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(self.model_name, torch_dtype=torch.float32)
+        self.model.eval()
+        self._torch = torch
+        logger.info(f"Loaded {self.model_name} for CPU generation")
+
+    def _format(self, prompt: str) -> str:
+        if getattr(self.tokenizer, "chat_template", None):
+            return self.tokenizer.apply_chat_template(
+                [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
+                tokenize=False, add_generation_prompt=True
+            )
+        return f"{SYSTEM_PROMPT}\n\nQuestion: {prompt}\nAnswer:"
+
+    def generate_batch(self, prompts: List[str], max_new_tokens: int = LLM_MAX_NEW_TOKENS) -> List[str]:
+        inputs = self.tokenizer([self._format(prompt) for prompt in prompts], return_tensors="pt", padding=True)
+        with self._torch.inference_mode():
+            outputs = self.model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=self.tokenizer.pad_token_id
+            )
+        # Left padding puts every prompt's end at the same column
+        generated = outputs[:, inputs["input_ids"].shape[1]:]
+        return [text.strip() for text in self.tokenizer.batch_decode(generated, skip_special_tokens=True)]
+
+
+BACKENDS = {
+    "stub": StubBackend,
+    "litellm": LiteLLMBackend,
+    "transformers": TransformersBackend,
+}
+
+
+def create_backend(name: str) -> Optional[LLMBackend]:
+    """Backend for a configured name, or None for "none" (knowledge-base answers only)"""
+    if name == "none":
+        return None
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {name} (expected one of none, {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
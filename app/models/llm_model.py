@@ -1,8 +1,10 @@
 import json
 import os
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
-import litellm  
+
+from app.config import LLM_BACKEND
+from app.models.llm_backends import LLMBackend, create_backend
 
 logger = logging.getLogger(__name__)
 
@@ -11,14 +13,20 @@ class LLMModel:
         self.model = None
         self.use_llm = False 
         self.wikipedia_data = None
+        self.backend: Optional[LLMBackend] = None
 
-    def load_model(self):
-        """Load the actual LLM model if available, otherwise use local mode"""
+    def load_model(self, backend_name: str = LLM_BACKEND):
+        """Load the configured generative backend if there is one, otherwise use local mode"""
         try:
-           
-            self.model = "gpt-3.5-turbo" 
+            backend = create_backend(backend_name)
+            if backend is None:
+                logger.info("No LLM backend configured, using local response mode")
+                return
+            backend.load()
+            self.backend = backend
+            self.model = backend.name
             self.use_llm = True
-            logger.info("Real LLM model configured")
+            logger.info(f"LLM backend {backend.name} loaded")
         except Exception as e:
             self.use_llm = False
             logger.warning(f"Using local response mode: {e}")
@@ -30,22 +38,9 @@ class LLMModel:
     def generate_response(self, question: str) -> str:
         """Generate response using either real LLM or local responses"""
         try:
-            if self.use_llm and self.model:
-                # Use real LLM API
-                messages = [
-                    {
-                        "role": "user",
-                        "content": question  # Text only, no images
-                    }
-                ]
-                
-                response = litellm.completion(
-                    model=self.model,  # Use the configured working model
-                    messages=messages,
-                    max_tokens=500
-                )
-                
-                return response.choices[0].message.content
+            if self.use_llm and self.backend:
+                # Unbatched; the API goes through the batch scheduler instead
+                return self.backend.generate_batch([question])[0]
             else:
                 # Fall back to local responses
                 return self._get_local_response(question)
@@ -126,6 +121,18 @@ class LLMModel:
         if not hasattr(self, 'medical_knowledge') or not self.medical_knowledge:
             return "Medical knowledge base is not loaded. Please restart the application."
 
+        solution = self.find_solution(question)
+        if solution is not None:
+            return solution
+
+        # If no specific condition found, provide general guidance
+        return self._get_general_guidance(question)
+
+    def find_solution(self, question: str) -> Optional[str]:
+        """Knowledge-base answer for an emergency or a known condition, or None if nothing matches"""
+        if not getattr(self, 'medical_knowledge', None):
+            return None
+
         question_lower = question.lower()
 
         # Check for emergency situations first
@@ -146,8 +153,7 @@ class LLMModel:
             best_condition, best_data = relevant_conditions[0]
             return self._format_solution_response(best_condition, best_data)
 
-        # If no specific condition found, provide general guidance
-        return self._get_general_guidance(question)
+        return None
 
     def _format_solution_response(self, condition: str, data: dict) -> str:
         """Format a comprehensive solution response"""
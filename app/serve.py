@@ -0,0 +1,57 @@
+"""
+Multi-worker launcher.
+
+Builds the medicine and interaction indices once in this parent process, writes
+them as memory-mapped segments, and starts uvicorn workers that attach to those
+segments read-only instead of each parsing the CSVs:
+
+    python -m app.serve --workers 4 --port 8000
+"""
+import argparse
+import gc
+import logging
+import os
+from pathlib import Path
+
+import uvicorn
+
+from app.config import SHARED_INDEX_DIR, SHARED_INDEX_DIR_ENV
+from app.services.data_loader import DataLoader
+from app.services.index_segments import is_current, write_segments
+from app.services.static_bundle import ensure_bundle
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def build_shared_index(index_dir: Path, rebuild: bool = False):
+    """Parse the CSVs and write index segments, unless current ones already exist"""
+    if not rebuild and is_current(index_dir):
+        logger.info(f"Shared index in {index_dir} is up to date")
+        return
+
+    loader = DataLoader()
+    loader.load_data()
+    write_segments(loader.medicines, loader.drug_interactions, index_dir)
+    ensure_bundle(loader.medicines, loader.drug_interactions)
+    # The parent only supervises workers from here on; drop its copy of the data
+    del loader
+    gc.collect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with workers sharing one memory-mapped index")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--index-dir", type=Path, default=SHARED_INDEX_DIR)
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild segments even if they look current")
+    args = parser.parse_args()
+
+    build_shared_index(args.index_dir, args.rebuild)
+    os.environ[SHARED_INDEX_DIR_ENV] = str(args.index_dir.resolve())
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
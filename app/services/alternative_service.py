@@ -0,0 +1,232 @@
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+import logging
+
+import numpy as np
+
+from app.models.drug_model import Alternative, AlternativesRequest, AlternativesResponse
+from app.services.data_loader import data_loader
+from app.services.medicine_store import MedicineStore, parse_ingredients
+
+logger = logging.getLogger(__name__)
+
+# Bits set in each byte value, for popcount on NumPy versions without bitwise_count
+_BYTE_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def popcount_rows(bits: np.ndarray) -> np.ndarray:
+    """Number of set bits in each row of a 2-D uint64 bitset matrix"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bits).sum(axis=1, dtype=np.int64)
+    as_bytes = np.ascontiguousarray(bits).view(np.uint8).reshape(bits.shape[0], -1)
+    return _BYTE_POPCOUNT[as_bytes].sum(axis=1, dtype=np.int64)
+
+
+def _set_bits(matrix: np.ndarray, rows: np.ndarray, drug_ids: np.ndarray):
+    """Set bit drug_ids[i] in matrix row rows[i], for all i at once"""
+    drug_ids = drug_ids.astype(np.uint64)
+    np.bitwise_or.at(matrix, (rows, (drug_ids >> np.uint64(6)).astype(np.intp)),
+                     np.uint64(1) << (drug_ids & np.uint64(63)))
+
+
+def _catalogue_columns(medicines) -> Tuple[np.ndarray, Dict[int, str], np.ndarray, np.ndarray]:
+    """Per-row composition and use codes, the composition string of each code, and popularity
+
+    The in-memory store already holds interned string ids; rows of the SQLite
+    backend are read once and their strings numbered here.
+    """
+    if isinstance(medicines, MedicineStore):
+        compositions = medicines.columns["generic_name"].astype(np.int64)
+        strings = {int(code): medicines.pool[int(code)] for code in np.unique(compositions)}
+        return compositions, strings, medicines.columns["uses"], medicines.popularity
+    codes: Dict[str, int] = {}
+    compositions, uses, popularity = [], [], []
+    for generic_name, use, row_popularity in medicines.connections.execute(
+            "SELECT generic_name, uses, popularity FROM medicines ORDER BY row"):
+        compositions.append(codes.setdefault(generic_name, len(codes)))
+        uses.append(codes.setdefault(use, len(codes)))
+        popularity.append(row_popularity)
+    strings = {code: value for value, code in codes.items()}
+    return (np.array(compositions, dtype=np.int64), strings, np.array(uses, dtype=np.int64),
+            np.array(popularity, dtype=np.uint8))
+
+
+class AlternativeService:
+    """Finds same-use or same-composition substitutes that interact least with a regimen
+
+    Substitutes sharing an ingredient with the rest of the regimen are left out,
+    so an alternative never duplicates a drug the patient already takes.
+
+    Every interaction drug's partners are a packed uint64 bitset, and every medicine
+    carries the bitset of its ingredients and the OR of their partners, so scoring
+    all candidates against a regimen is one vectorized AND plus popcount. The
+    bitsets only hold ingredients the interaction data knows, so compositions
+    are matched separately, by their full normalized ingredient set.
+    """
+
+    def __init__(self):
+        self.data_loader = data_loader
+        self.partners = np.zeros((0, 1), dtype=np.uint64)
+        self.medicine_members = np.zeros((0, 1), dtype=np.uint64)
+        self.medicine_partners = np.zeros((0, 1), dtype=np.uint64)
+        self.ingredients_checked = np.zeros(0, dtype=bool)
+        # Id of each medicine's normalized ingredient set, -1 for an empty composition
+        self.composition_sets = np.zeros(0, dtype=np.int32)
+        self._set_ids: Dict[FrozenSet[str], int] = {}
+        self.use_codes = np.zeros(0, dtype=np.int64)
+        self.popularity = np.zeros(0, dtype=np.uint8)
+
+    def build(self):
+        """Precompute the partner and ingredient bitsets from the loaded stores"""
+        interactions = self.data_loader.drug_interactions
+        medicines = self.data_loader.medicines
+        drug_count = len(interactions.drug_lookup)
+        words = max(1, (drug_count + 63) // 64)
+
+        # Distinct pair keys already hold both canonical drug ids
+        pair_keys = interactions.pair_summary()[0]
+        first = (pair_keys >> np.uint64(32)).astype(np.int64)
+        second = (pair_keys & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        partners = np.zeros((drug_count, words), dtype=np.uint64)
+        _set_bits(partners, first, second)
+        _set_bits(partners, second, first)
+
+        compositions, strings, use_codes, popularity = _catalogue_columns(medicines)
+        # Map each distinct composition to its ingredient set and drug ids once, then expand to medicine rows
+        set_ids: Dict[FrozenSet[str], int] = {}
+        composition_drugs: Dict[int, Tuple[int, List[int]]] = {}
+        composition_sets = np.full(len(compositions), -1, dtype=np.int32)
+        member_rows, member_drugs = [], []
+        for row, code in enumerate(compositions.tolist()):
+            entry = composition_drugs.get(code)
+            if entry is None:
+                ingredients = parse_ingredients(strings[code] or "")
+                set_id = set_ids.setdefault(frozenset(ingredients), len(set_ids)) if ingredients else -1
+                entry = composition_drugs[code] = (set_id, self._drug_ids(ingredients))
+            set_id, drug_ids = entry
+            composition_sets[row] = set_id
+            member_rows.extend([row] * len(drug_ids))
+            member_drugs.extend(drug_ids)
+
+        member_rows = np.array(member_rows, dtype=np.intp)
+        member_drugs = np.array(member_drugs, dtype=np.int64)
+        members = np.zeros((len(medicines), words), dtype=np.uint64)
+        _set_bits(members, member_rows, member_drugs)
+        medicine_partners = np.zeros((len(medicines), words), dtype=np.uint64)
+        np.bitwise_or.at(medicine_partners, member_rows, partners[member_drugs])
+
+        self.partners = partners
+        self.medicine_members = members
+        self.medicine_partners = medicine_partners
+        self.ingredients_checked = members.any(axis=1)
+        self.composition_sets = composition_sets
+        self._set_ids = set_ids
+        self.use_codes = use_codes
+        self.popularity = popularity
+        logger.info(
+            f"Built interaction bitsets for {drug_count} drugs and {len(medicines)} medicines "
+            f"({int(self.ingredients_checked.sum())} with known ingredients)"
+        )
+
+    def _drug_ids(self, ingredients: List[str]) -> List[int]:
+        lookup = self.data_loader.drug_interactions.drug_lookup
+        return [lookup[name] for name in ingredients if name in lookup]
+
+    def _resolve(self, name: str) -> Set[int]:
+        """Drug ids behind a regimen entry: a medicine's ingredients, or an interaction drug itself"""
+        record = self.data_loader.medicines.find_by_name(name)
+        if record is not None:
+            return set(self._drug_ids(parse_ingredients(record.generic_name)))
+        drug_id = self.data_loader.drug_interactions.drug_lookup.get(name.lower())
+        return {drug_id} if drug_id is not None else set()
+
+    def _bits(self, drug_ids: Set[int]) -> np.ndarray:
+        bits = np.zeros((1, self.partners.shape[1]), dtype=np.uint64)
+        if drug_ids:
+            ids = np.fromiter(drug_ids, dtype=np.int64)
+            _set_bits(bits, np.zeros(len(ids), dtype=np.intp), ids)
+        return bits
+
+    def find_alternatives(self, request: AlternativesRequest) -> AlternativesResponse:
+        """Rank substitutes for request.replace by interactions with the rest of the regimen"""
+        medicines = self.data_loader.medicines
+        replace_key = request.replace.lower()
+        rest = [name for name in request.medicines if name.lower() != replace_key]
+        rest_drugs = {name: self._resolve(name) for name in rest}
+        rest_bits = self._bits(set().union(*rest_drugs.values()))
+
+        target = medicines.find_by_name(request.replace)
+        target_drugs = self._resolve(request.replace)
+        current_count = self._conflict_count(target_drugs, rest_bits)
+
+        # Candidates: the same full ingredient set, or the same indicated use as the replaced medicine
+        target_set = self._composition_set(target, request.replace)
+        same_composition = np.zeros(len(self.composition_sets), dtype=bool)
+        if target_set is not None:
+            same_composition = self.composition_sets == target_set
+        same_use = np.zeros(len(self.composition_sets), dtype=bool)
+        if target is not None and target.uses:
+            same_use = self.use_codes == self.use_codes[target.row]
+        candidates = np.flatnonzero(same_composition | same_use)
+        if target is not None:
+            candidates = candidates[candidates != target.row]
+        # A candidate sharing an ingredient with the rest of the regimen would double a dose
+        duplicates = (self.medicine_members[candidates] & rest_bits).any(axis=1)
+        candidates = candidates[~duplicates]
+
+        conflicts = popcount_rows(self.medicine_partners[candidates] & rest_bits)
+        checked = self.ingredients_checked[candidates]
+        # Known ingredients first, fewest conflicts, exact composition before same use, then popularity
+        order = np.lexsort((
+            -self.popularity[candidates].astype(np.int16),
+            ~same_composition[candidates],
+            conflicts,
+            ~checked,
+        ))
+
+        alternatives = []
+        seen = {replace_key}
+        for index in order:
+            row = int(candidates[index])
+            record = medicines[row]
+            name = record.name
+            if name.lower() in seen:
+                continue
+            seen.add(name.lower())
+            partner_bits = self.medicine_partners[row:row + 1]
+            alternatives.append(Alternative(
+                name=name,
+                generic_name=record.generic_name,
+                uses=record.uses,
+                match="composition" if same_composition[row] else "use",
+                interaction_count=int(conflicts[index]),
+                conflicting_with=[
+                    other for other, drug_ids in rest_drugs.items()
+                    if drug_ids and popcount_rows(partner_bits & self._bits(drug_ids))[0]
+                ],
+                ingredients_checked=bool(checked[index])
+            ))
+            if len(alternatives) >= request.limit:
+                break
+
+        return AlternativesResponse(
+            replace=request.replace,
+            current_interaction_count=current_count,
+            alternatives=alternatives
+        )
+
+    def _composition_set(self, target, name: str) -> Optional[int]:
+        """Ingredient set id of the replaced medicine, or of a plain drug name standing in for one"""
+        if target is not None:
+            set_id = int(self.composition_sets[target.row])
+            return set_id if set_id >= 0 else None
+        return self._set_ids.get(frozenset(parse_ingredients(name)))
+
+    def _conflict_count(self, drug_ids: Set[int], rest_bits: np.ndarray) -> int:
+        """How many of the regimen's drugs interact with any of drug_ids"""
+        if not drug_ids:
+            return 0
+        partner_bits = np.bitwise_or.reduce(self.partners[sorted(drug_ids)], axis=0, keepdims=True)
+        return int(popcount_rows(partner_bits & rest_bits)[0])
+
+
+alternative_service = AlternativeService()
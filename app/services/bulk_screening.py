@@ -0,0 +1,287 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import SHARED_INDEX_DIR
+from app.services.index_segments import attach_segments, is_current, write_segments
+from app.services.medicine_store import parse_ingredients
+from app.services.severity import SEVERITY_LEVELS, severity_code
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 2000
+TOP_N = 20
+
+Regimen = Tuple[str, List[str]]
+
+
+def read_regimens(path: Path, medicines_field: str = "medicines", id_field: str = "id",
+                  separator: str = ";") -> Iterator[Regimen]:
+    """Stream (regimen id, medicine names) from a CSV or JSONL export, one regimen per row
+
+    In CSV files the medicines column holds names joined by separator; in JSONL
+    it may also be a list. Rows without an id are numbered from 1.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.suffix.lower() in (".jsonl", ".ndjson"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for number, row in enumerate(rows, 1):
+            medicines = row.get(medicines_field) or []
+            if isinstance(medicines, str):
+                medicines = medicines.split(separator)
+            names = [name.strip() for name in medicines if name and name.strip()]
+            regimen_id = row.get(id_field)
+            yield str(number if regimen_id in (None, "") else regimen_id), names
+
+
+def _chunks(regimens: Iterator[Regimen], size: int) -> Iterator[List[Regimen]]:
+    while True:
+        chunk = list(islice(regimens, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class RegimenScreener:
+    """Screens regimens against the interaction index, a whole chunk of regimens per NumPy call
+
+    Regimen entries may be interaction drug names or medicine brand names; brands
+    are expanded to the ingredients of their composition. Every pair of drugs from
+    two different entries is a candidate, and the candidates of a whole chunk are
+    looked up with one searchsorted over the distinct interacting pairs.
+    """
+
+    def __init__(self, medicines, interactions, min_severity: Optional[str] = None):
+        self.medicines = medicines
+        self.interactions = interactions
+        self.min_code = severity_code(min_severity) if min_severity else 0
+        self.pair_keys, self.pair_severity, self.pair_counts = interactions.pair_summary()
+        # Reports name drugs as the dataset writes them, not by their lower-cased lookup keys
+        self.drug_names = interactions.canonical_names()
+        self._resolved: Dict[str, Tuple[int, ...]] = {}
+
+    def resolve(self, name: str) -> Tuple[int, ...]:
+        """Canonical drug ids behind one regimen entry; empty if the name is unknown"""
+        key = name.lower()
+        drug_ids = self._resolved.get(key)
+        if drug_ids is None:
+            lookup = self.interactions.drug_lookup
+            if key in lookup:
+                drug_ids = (lookup[key],)
+            else:
+                record = self.medicines.find_by_name(name)
+                ingredients = parse_ingredients(record.generic_name) if record is not None else []
+                drug_ids = tuple(dict.fromkeys(lookup[i] for i in ingredients if i in lookup))
+            self._resolved[key] = drug_ids
+        return drug_ids
+
+    def screen(self, regimens: List[Regimen]) -> Tuple[List[Dict], Dict]:
+        """One report per regimen, plus the chunk's counters for the aggregate statistics"""
+        candidates: List[int] = []
+        spans = []
+        unresolved = Counter()
+        for _, names in regimens:
+            start = len(candidates)
+            entries = []
+            for name in names:
+                drug_ids = self.resolve(name)
+                if drug_ids:
+                    entries.append(drug_ids)
+                else:
+                    unresolved[name.lower()] += 1
+            seen = set()
+            for i in range(len(entries)):
+                for j in range(i + 1, len(entries)):
+                    for first in entries[i]:
+                        for second in entries[j]:
+                            if first != second:
+                                key = (min(first, second) << 32) | max(first, second)
+                                if key not in seen:
+                                    seen.add(key)
+                                    candidates.append(key)
+            spans.append((start, len(candidates), len(names) - len(entries)))
+
+        keys = np.array(candidates, dtype=np.uint64)
+        positions = np.searchsorted(self.pair_keys, keys)
+        positions = np.minimum(positions, max(len(self.pair_keys) - 1, 0))
+        found = (self.pair_keys[positions] == keys) if len(self.pair_keys) else np.zeros(len(keys), dtype=bool)
+        severities = np.where(found, self.pair_severity[positions] if len(self.pair_keys) else 0, -1)
+        hits = found & (severities >= self.min_code)
+
+        reports = []
+        risks = Counter()
+        pairs = Counter()
+        for (regimen_id, names), (start, end, unknown) in zip(regimens, spans):
+            counts = [0] * len(SEVERITY_LEVELS)
+            pair_reports = []
+            for index in np.flatnonzero(hits[start:end]) + start:
+                key = candidates[index]
+                code = int(severities[index])
+                counts[code] += 1
+                pairs[key] += 1
+                pair_reports.append({
+                    "drug_a": self.drug_names[key >> 32],
+                    "drug_b": self.drug_names[key & 0xFFFFFFFF],
+                    "severity": SEVERITY_LEVELS[code],
+                    "interactions": int(self.pair_counts[positions[index]]),
+                })
+            pair_reports.sort(key=lambda pair: -severity_code(pair["severity"]))
+            risk = pair_reports[0]["severity"] if pair_reports else "none"
+            risks[risk] += 1
+            report = {"id": regimen_id, "medicines": len(names), "unresolved": unknown, "risk": risk,
+                      "interacting_pairs": len(pair_reports)}
+            report.update({level: counts[severity_code(level)] for level in ("high", "moderate", "low", "unknown")})
+            report["pairs"] = pair_reports
+            reports.append(report)
+        return reports, {"risks": risks, "pairs": pairs, "unresolved": unresolved}
+
+
+# Per-process screener, set up once by the pool initializer
+_screener: Optional[RegimenScreener] = None
+
+
+def _init_worker(index_dir: str, min_severity: Optional[str]):
+    global _screener
+    medicines, interactions = attach_segments(Path(index_dir))
+    _screener = RegimenScreener(medicines, interactions, min_severity)
+
+
+def _screen_chunk(chunk: List[Regimen]) -> Tuple[List[Dict], Dict]:
+    return _screener.screen(chunk)
+
+
+class ReportWriter:
+    """Per-regimen report as JSONL, or as a flat CSV when the output path ends in .csv"""
+
+    CSV_FIELDS = ("id", "risk", "medicines", "unresolved", "interacting_pairs", "high", "moderate", "low",
+                  "unknown", "pairs")
+
+    def __init__(self, path: Optional[Path]):
+        self._file = open(path, "w", encoding="utf-8", newline="") if path else sys.stdout
+        self._csv = None
+        if path and path.suffix.lower() == ".csv":
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(self.CSV_FIELDS)
+
+    def write(self, reports: List[Dict]):
+        if self._csv is None:
+            self._file.write("".join(json.dumps(report, ensure_ascii=False) + "\n" for report in reports))
+            return
+        for report in reports:
+            pairs = "; ".join(f"{p['drug_a']} + {p['drug_b']} ({p['severity']})" for p in report["pairs"])
+            self._csv.writerow([report[field] for field in self.CSV_FIELDS[:-1]] + [pairs])
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+def ensure_segments(index_dir: Path):
+    """Build the shared index segments from the CSVs unless current ones already exist"""
+    if is_current(index_dir):
+        return
+    from app.services.data_loader import DataLoader
+    loader = DataLoader()
+    loader.load_data()
+    write_segments(loader.medicines, loader.drug_interactions, index_dir)
+
+
+def screen_file(input_path: Path, output_path: Optional[Path], index_dir: Path = SHARED_INDEX_DIR,
+                workers: int = os.cpu_count() or 1, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                min_severity: Optional[str] = None, progress_seconds: float = 5.0, **read_options) -> Dict:
+    """Screen every regimen in input_path, writing reports in input order, and return aggregate statistics
+
+    Input is read lazily in chunks and at most two chunks per worker are in
+    flight, so memory stays flat however large the export is.
+    """
+    ensure_segments(index_dir)
+    _, interactions = attach_segments(index_dir)
+    drug_names = interactions.canonical_names()
+
+    writer = ReportWriter(output_path)
+    risks, pairs, unresolved = Counter(), Counter(), Counter()
+    total = 0
+    started = last_report = time.perf_counter()
+
+    def collect(future):
+        nonlocal total, last_report
+        reports, counters = future.result()
+        writer.write(reports)
+        total += len(reports)
+        risks.update(counters["risks"])
+        pairs.update(counters["pairs"])
+        unresolved.update(counters["unresolved"])
+        now = time.perf_counter()
+        if now - last_report >= progress_seconds:
+            logger.info(f"{total:,} regimens screened, {total / (now - started):,.0f} regimens/s")
+            last_report = now
+
+    chunks = _chunks(read_regimens(input_path, **read_options), chunk_size)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(str(index_dir), min_severity)) as pool:
+            in_flight = deque()
+            for chunk in chunks:
+                in_flight.append(pool.submit(_screen_chunk, chunk))
+                # Results are written in input order; wait once the window is full
+                while len(in_flight) >= workers * 2 or (in_flight and in_flight[0].done()):
+                    collect(in_flight.popleft())
+            while in_flight:
+                collect(in_flight.popleft())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "regimens": total,
+        "seconds": round(elapsed, 2),
+        "regimens_per_second": round(total / elapsed, 1) if elapsed else 0.0,
+        "workers": workers,
+        "by_risk": {level: risks.get(level, 0) for level in ("high", "moderate", "low", "unknown", "none")},
+        "top_pairs": [{"drug_a": drug_names[key >> 32], "drug_b": drug_names[key & 0xFFFFFFFF], "regimens": count}
+                      for key, count in pairs.most_common(TOP_N)],
+        "top_unresolved": [{"name": name, "regimens": count} for name, count in unresolved.most_common(TOP_N)],
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Screen a prescription export for drug interactions")
+    parser.add_argument("input", type=Path, help="CSV or JSONL file with one regimen per row")
+    parser.add_argument("--output", type=Path, help="Per-regimen report (.jsonl or .csv); default stdout")
+    parser.add_argument("--summary", type=Path, help="Write the aggregate statistics to this JSON file")
+    parser.add_argument("--medicines-field", default="medicines")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--separator", default=";", help="Separator of medicine names in CSV input")
+    parser.add_argument("--min-severity", choices=("low", "moderate", "high"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--index-dir", type=Path, default=SHARED_INDEX_DIR)
+    args = parser.parse_args()
+
+    summary = screen_file(
+        args.input, args.output, args.index_dir, args.workers, args.chunk_size, args.min_severity,
+        medicines_field=args.medicines_field, id_field=args.id_field, separator=args.separator
+    )
+    logger.info(f"Screened {summary['regimens']:,} regimens in {summary['seconds']} s "
+                f"({summary['regimens_per_second']:,.0f} regimens/s): {summary['by_risk']}")
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,127 +1,190 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from app.config import DRUG_INTERACTIONS_FILE, MEDICINE_DETAILS_FILE
-from app.models.drug_model import Medicine, DrugInteraction
+from app.config import DRUG_INTERACTIONS_FILE, MEDICINE_DETAILS_FILE, STORAGE_BACKEND
+from app.models.drug_model import Medicine, DrugInteraction, InteractionTemplate
+from app.services.medicine_store import MedicineStore, MEDICINE_COLUMNS, POPULARITY_COLUMN, parse_ingredients
+from app.services.interaction_store import InteractionStore
+from app.services.severity import severity_code
+from app.services.index_segments import attach_segments, dataset_version, read_manifest, source_modified
+from app.services.readiness import readiness
+from app.utils.helpers import get_rss_bytes, format_bytes
 
 logger = logging.getLogger(__name__)
 
 class DataLoader:
     def __init__(self):
-        self.drug_interactions: List[DrugInteraction] = []
-        self.medicines: List[Medicine] = []
-        self.medicine_dict: Dict[str, Medicine] = {}
-        self.interaction_dict: Dict[str, List[DrugInteraction]] = {}
+        self.drug_interactions = InteractionStore()
+        self.medicines = MedicineStore()
+        # Identify the loaded data for HTTP caching: a content hash and when the CSVs last changed
+        self.dataset_version = ""
+        self.data_modified = 0.0
         
     def load_data(self):
-        """Load and parse both CSV files"""
+        """Load and parse both CSV files concurrently"""
         try:
-            self._load_medicine_details()
-            self._load_drug_interactions()
-            self._build_indices()
+            rss_before = get_rss_bytes()
+            # Fingerprint the CSVs first: each store is marked ready as soon as it loads, and cached
+            # responses must never be tagged with an empty version
+            self.dataset_version = dataset_version()
+            self.data_modified = source_modified()
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="csv-load") as executor:
+                medicines = executor.submit(self._load_medicine_details)
+                interactions = executor.submit(self._load_drug_interactions)
+                medicines.result()
+                interactions.result()
             logger.info(f"Loaded {len(self.medicines)} medicines and {len(self.drug_interactions)} interactions")
+
+            store_usage = self.medicines.memory_usage()
+            rss_after = get_rss_bytes()
+            logger.info(
+                f"Medicine store: {format_bytes(store_usage['columns'] + store_usage['name_index'])} columns, "
+                f"{format_bytes(store_usage['string_pool'])} for {store_usage['distinct_strings']} distinct strings; "
+                f"RSS {format_bytes(rss_before)} -> {format_bytes(rss_after)}"
+            )
+            interaction_usage = self.drug_interactions.memory_usage()
+            logger.info(
+                f"Interaction descriptions: {interaction_usage['template_count']} templates, "
+                f"{format_bytes(interaction_usage['arrays'] + interaction_usage['templates'])} stored "
+                f"instead of {format_bytes(interaction_usage['raw_description_bytes'])} as per-row strings"
+            )
         except Exception as e:
             logger.error(f"Error loading data: {e}")
             raise
     
+    def attach(self, index_dir: Path):
+        """Attach to shared index segments written by app/serve.py instead of parsing the CSVs"""
+        try:
+            rss_before = get_rss_bytes()
+            with readiness.track("medicines"), readiness.track("interactions"):
+                self.medicines, self.drug_interactions = attach_segments(index_dir)
+                manifest = read_manifest(index_dir)
+                self.dataset_version = manifest["dataset_version"]
+                self.data_modified = manifest["data_modified"]
+            logger.info(
+                f"Attached {len(self.medicines)} medicines and {len(self.drug_interactions)} interactions "
+                f"from {index_dir}; RSS {format_bytes(rss_before)} -> {format_bytes(get_rss_bytes())}"
+            )
+        except Exception as e:
+            logger.error(f"Error attaching shared index: {e}")
+            raise
+    
     def _load_medicine_details(self):
-        """Load medicine details from CSV"""
-        if MEDICINE_DETAILS_FILE.exists():
-            df = pd.read_csv(MEDICINE_DETAILS_FILE)
-            
-            for index, row in df.iterrows():
-                # Generate a unique medicine_id from the name if not provided
-                medicine_id = str(row.get('medicine_id', ''))
-                if not medicine_id:
-                    # Create ID from medicine name by removing spaces and special chars
-                    medicine_name = str(row.get('Medicine Name', '')).strip()
-                    medicine_id = ''.join(c for c in medicine_name.lower() 
-                                        if c.isalnum() or c.isspace()).replace(' ', '_')
-                    # Add index to ensure uniqueness
-                    medicine_id = f"{medicine_id}_{index}"
-                
-                medicine = Medicine(
-                    medicine_id=medicine_id,
-                    name=str(row.get('Medicine Name', '')).strip(),
-                    generic_name=str(row.get('Composition', '')).strip(),
-                    dosage_form="",  # Not available in the new CSV
-                    strength="",     # Not available in the new CSV
-                    manufacturer=str(row.get('Manufacturer', '')).strip(),
-                    uses=str(row.get('Uses', '')).strip(),
-                    side_effects=str(row.get('Side_effects', '')).strip(),
-                    precautions=""   # Not available in the new CSV
+        """Load medicine details from CSV into the columnar store"""
+        with readiness.track("medicines"):
+            if MEDICINE_DETAILS_FILE.exists():
+                df = pd.read_csv(
+                    MEDICINE_DETAILS_FILE,
+                    usecols=lambda column: (column in MEDICINE_COLUMNS
+                                            or column in ("medicine_id", POPULARITY_COLUMN)),
+                    dtype=str,
+                    keep_default_na=False
                 )
-                self.medicines.append(medicine)
-                logger.info(f"Loaded medicine: {medicine.name}")
+                self.medicines = MedicineStore.from_frame(df)
     
     def _load_drug_interactions(self):
-        """Load drug interactions from CSV"""
-        if DRUG_INTERACTIONS_FILE.exists():
-            df = pd.read_csv(DRUG_INTERACTIONS_FILE)
-            
-            for _, row in df.iterrows():
-                interaction = DrugInteraction(
-                    drug_a=str(row.get('Drug 1', '')),
-                    drug_b=str(row.get('Drug 2', '')),
-                    interaction_level="",  # Placeholder since not available in CSV
-                    description=str(row.get('Interaction Description', '')),
-                    severity="",  # Placeholder since not available in CSV
-                    recommendations=None  # No recommendations available
-                )
-                self.drug_interactions.append(interaction)
+        """Load drug interactions from CSV, splitting descriptions into templates"""
+        with readiness.track("interactions"):
+            if DRUG_INTERACTIONS_FILE.exists():
+                df = pd.read_csv(DRUG_INTERACTIONS_FILE, dtype=str, keep_default_na=False)
+                self.drug_interactions = InteractionStore.from_frame(df)
     
-    def _build_indices(self):
-        """Build lookup indices for faster searching"""
-        self.medicine_dict = {med.name.lower(): med for med in self.medicines}
-        
-        # Build interaction dictionary
-        for interaction in self.drug_interactions:
-            key = self._get_interaction_key(interaction.drug_a, interaction.drug_b)
-            if key not in self.interaction_dict:
-                self.interaction_dict[key] = []
-            self.interaction_dict[key].append(interaction)
+    def find_interactions(self, medicine_names: List[str], min_severity: Optional[str] = None,
+                          sort_by_severity: bool = False, limit: Optional[int] = None) -> List[DrugInteraction]:
+        """Find all interactions between the given medicines"""
+        rows = self.find_interaction_rows(medicine_names, min_severity, sort_by_severity, limit)
+        return [self.drug_interactions.interaction(row) for row in rows]
     
-    def _get_interaction_key(self, drug_a: str, drug_b: str) -> str:
-        """Create a consistent key for drug pairs (alphabetical order)"""
-        drugs = [drug_a.lower(), drug_b.lower()]
-        drugs.sort()
-        return f"{drugs[0]}_{drugs[1]}"
+    def resolve_drug_ids(self, name: str) -> Tuple[int, ...]:
+        """Interaction drug ids behind a name: the drug itself, or the ingredients of a medicine brand"""
+        lookup = self.drug_interactions.drug_lookup
+        if name.lower() in lookup:
+            return (lookup[name.lower()],)
+        record = self.medicines.find_by_name(name)
+        ingredients = parse_ingredients(record.generic_name) if record is not None else []
+        return tuple(dict.fromkeys(lookup[i] for i in ingredients if i in lookup))
     
-    def find_interactions(self, medicine_names: List[str]) -> List[DrugInteraction]:
-        """Find all interactions between the given medicines"""
-        interactions = []
+    def find_interaction_rows(self, medicine_names: List[str], min_severity: Optional[str] = None,
+                              sort_by_severity: bool = False, limit: Optional[int] = None) -> List[int]:
+        """Find interaction rows between the given medicines using the precomputed severity codes"""
+        store = self.drug_interactions
+        min_code = severity_code(min_severity) if min_severity else 0
+        # Sorting needs every match first; otherwise we can stop as soon as we have enough
+        stop_at = None if sort_by_severity else limit
+        rows = []
         checked_pairs = set()
+        entries = [self.resolve_drug_ids(name) for name in medicine_names]
         
-        for i, med1 in enumerate(medicine_names):
-            for j, med2 in enumerate(medicine_names):
-                if i != j:
-                    key = self._get_interaction_key(med1, med2)
-                    if key not in checked_pairs and key in self.interaction_dict:
-                        interactions.extend(self.interaction_dict[key])
-                        checked_pairs.add(key)
+        for i in range(len(entries)):
+            for j in range(i + 1, len(entries)):
+                for first in entries[i]:
+                    for second in entries[j]:
+                        key = (min(first, second) << 32) | max(first, second)
+                        if first != second and key not in checked_pairs:
+                            rows.extend(store.rows_for_key(key, min_code))
+                            checked_pairs.add(key)
+                            if stop_at is not None and len(rows) >= stop_at:
+                                return rows[:stop_at]
         
-        return interactions
+        if sort_by_severity and rows:
+            order = np.argsort(-store.severity_codes(rows).astype(np.int16), kind="stable")
+            rows = [rows[index] for index in order]
+        return rows[:limit] if limit is not None else rows
+    
+    def get_interaction_templates(self, contains: Optional[str] = None) -> List[InteractionTemplate]:
+        """List description templates with how many interactions use each"""
+        store = self.drug_interactions
+        counts = store.template_counts()
+        templates = []
+        for template_id, template in enumerate(store.templates):
+            text = template.text
+            if contains and contains.lower() not in text.lower():
+                continue
+            templates.append(InteractionTemplate(
+                template_id=template_id,
+                text=text,
+                interaction_count=int(counts[template_id])
+            ))
+        return templates
+    
+    def find_interactions_by_template(self, template_id: int, limit: int = 100) -> List[DrugInteraction]:
+        """Interactions whose description follows the given template"""
+        store = self.drug_interactions
+        return [store.interaction(row) for row in store.rows_for_template(template_id, limit)]
     
     def search_medicines(self, query: str, limit: int = 10) -> List[Medicine]:
         """Search medicines by name or generic name"""
-        query = query.lower()
-        results = []
-        
-        for medicine in self.medicines:
-            if (query in medicine.name.lower() or 
-                (medicine.generic_name and query in medicine.generic_name.lower())):
-                results.append(medicine)
-                if len(results) >= limit:
-                    break
-        
-        return results
+        return [record.to_model() for record in self.medicines.search(query, limit)]
+    
+    def autocomplete_medicines(self, prefix: str, limit: int = 10) -> List[str]:
+        """Medicine names starting with prefix, ranked by popularity"""
+        return self.medicines.complete(prefix, limit)
     
     def get_medicine_by_name(self, name: str) -> Optional[Medicine]:
         """Get medicine by exact name match"""
-        return self.medicine_dict.get(name.lower())
+        record = self.medicines.find_by_name(name)
+        return record.to_model() if record else None
+
+    def memory_report(self) -> Dict[str, Optional[int]]:
+        """Resident memory of the process and the sizes of the in-memory stores"""
+        report = {"rss_bytes": get_rss_bytes()}
+        report.update({f"medicine_store_{key}": value for key, value in self.medicines.memory_usage().items()})
+        report.update({f"interaction_store_{key}": value for key, value in self.drug_interactions.memory_usage().items()})
+        return report
+
+def create_data_loader(backend: str = STORAGE_BACKEND) -> DataLoader:
+    """DataLoader for the configured storage backend"""
+    if backend == "sqlite":
+        # Imported here because the SQLite backend builds on DataLoader
+        from app.services.sqlite_backend import SQLiteDataLoader
+        return SQLiteDataLoader()
+    if backend != "memory":
+        raise ValueError(f"Unknown storage backend: {backend}")
+    return DataLoader()
 
 # Global data loader instance
-data_loader = DataLoader()
\ No newline at end of file
+data_loader = create_data_loader()
\ No newline at end of file
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.config import DRUG_INTERACTIONS_FILE, MEDICINE_DETAILS_FILE
+from app.services.interaction_store import InteractionStore
+from app.services.medicine_store import MedicineStore
+from app.services.severity import SEVERITY_RULES_VERSION
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_FORMAT_VERSION = 3
+MANIFEST_FILE = "manifest.json"
+
+
+def source_fingerprint() -> Dict[str, List[int]]:
+    """Size and mtime of each source CSV, plus the severity rules version, used to tell whether segments are stale"""
+    fingerprint = {"severity_rules": [SEVERITY_RULES_VERSION]}
+    for path in (MEDICINE_DETAILS_FILE, DRUG_INTERACTIONS_FILE):
+        if path.exists():
+            stat = path.stat()
+            fingerprint[path.name] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprint
+
+
+def source_modified() -> float:
+    """Latest modification time of the source CSVs, as a Unix timestamp"""
+    return max((path.stat().st_mtime for path in (MEDICINE_DETAILS_FILE, DRUG_INTERACTIONS_FILE)
+                if path.exists()), default=0.0)
+
+
+# Last computed dataset version, keyed by the fingerprint it was computed for
+_dataset_version_cache: Dict[str, str] = {}
+
+
+def dataset_version() -> str:
+    """Short content hash of the source CSVs, recomputed only when their size or mtime changes"""
+    fingerprint = json.dumps(source_fingerprint(), sort_keys=True)
+    version = _dataset_version_cache.get(fingerprint)
+    if version is None:
+        digest = hashlib.sha256()
+        # Severities are derived data stored with the index, so the rules are part of the version
+        digest.update(f"severity-rules-{SEVERITY_RULES_VERSION}".encode())
+        for path in (MEDICINE_DETAILS_FILE, DRUG_INTERACTIONS_FILE):
+            if path.exists():
+                digest.update(path.name.encode())
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(block)
+        version = digest.hexdigest()[:16]
+        _dataset_version_cache.clear()
+        _dataset_version_cache[fingerprint] = version
+    return version
+
+
+def read_manifest(index_dir: Path) -> Dict:
+    with open(index_dir / MANIFEST_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_current(index_dir: Path) -> bool:
+    """True if index_dir holds segments built from the CSVs as they are now"""
+    try:
+        manifest = read_manifest(index_dir)
+    except (OSError, ValueError):
+        return False
+    return (manifest.get("format") == SEGMENT_FORMAT_VERSION
+            and manifest.get("sources") == source_fingerprint())
+
+
+def write_segments(medicines: MedicineStore, interactions: InteractionStore, index_dir: Path):
+    """Write both stores as .npy segments, replacing index_dir atomically"""
+    index_dir = Path(index_dir)
+    staging_dir = index_dir.with_name(index_dir.name + ".tmp")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    staging_dir.mkdir(parents=True)
+
+    medicine_segments = medicines.to_segments()
+    interaction_segments, interaction_metadata = interactions.to_segments()
+    for prefix, segments in (("medicines", medicine_segments), ("interactions", interaction_segments)):
+        for name, array in segments.items():
+            np.save(staging_dir / f"{prefix}.{name}.npy", np.ascontiguousarray(array))
+
+    manifest = {
+        "format": SEGMENT_FORMAT_VERSION,
+        "sources": source_fingerprint(),
+        "dataset_version": dataset_version(),
+        "data_modified": source_modified(),
+        "medicines": sorted(medicine_segments),
+        "interactions": sorted(interaction_segments),
+        "interaction_metadata": interaction_metadata,
+    }
+    with open(staging_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    # Workers that still map the old files keep their (unlinked) pages until they exit
+    shutil.rmtree(index_dir, ignore_errors=True)
+    staging_dir.rename(index_dir)
+    logger.info(f"Wrote shared index segments to {index_dir}")
+
+
+def _map_segment(path: Path) -> np.ndarray:
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        # Zero-length arrays cannot be memory-mapped
+        return np.load(path)
+
+
+def attach_segments(index_dir: Path) -> Tuple[MedicineStore, InteractionStore]:
+    """Open previously written segments read-only; pages are shared through the OS page cache"""
+    index_dir = Path(index_dir)
+    manifest = read_manifest(index_dir)
+    if manifest.get("format") != SEGMENT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported index segment format in {index_dir}")
+
+    medicine_segments = {
+        name: _map_segment(index_dir / f"medicines.{name}.npy") for name in manifest["medicines"]
+    }
+    interaction_segments = {
+        name: _map_segment(index_dir / f"interactions.{name}.npy") for name in manifest["interactions"]
+    }
+    return (
+        MedicineStore.from_segments(medicine_segments),
+        InteractionStore.from_segments(interaction_segments, manifest["interaction_metadata"])
+    )
@@ -10,6 +10,7 @@ import logging
 
 from app.models.drug_model import InteractionRequest, InteractionResponse, DrugInteraction
 from app.services.data_loader import data_loader
+from app.services.severity import severity_code
 
 logger = logging.getLogger(__name__)
 
@@ -19,20 +20,22 @@ class InteractionService:
     
     def check_interactions(self, request: InteractionRequest) -> InteractionResponse:
         """Check interactions between multiple medicines"""
-        interactions = self.data_loader.find_interactions(request.medicines)
+        store = self.data_loader.drug_interactions
+        rows = self.data_loader.find_interaction_rows(
+            request.medicines,
+            min_severity=request.min_severity,
+            sort_by_severity=request.sort_by_severity,
+            limit=request.limit
+        )
+        interactions = [store.interaction(row) for row in rows]
         
-        # Calculate severity summary
+        # Severity summary from the codes assigned at load time
+        counts = store.severity_counts(rows)
         severity_summary = {
-            "high": 0,
-            "moderate": 0,
-            "low": 0,
-            "unknown": 0
+            level: int(counts[severity_code(level)])
+            for level in ("high", "moderate", "low", "unknown")
         }
         
-        for interaction in interactions:
-            severity = interaction.severity.lower() if interaction.severity else "unknown"
-            severity_summary[severity] = severity_summary.get(severity, 0) + 1
-        
         # Generate recommendations
         recommendations = self._generate_recommendations(interactions, severity_summary)
         
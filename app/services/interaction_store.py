@@ -0,0 +1,279 @@
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.models.drug_model import DrugInteraction
+from app.services.severity import SEVERITY_LEVELS, classify_severity
+from app.utils.string_pool import FrozenStringPool, StringPool
+
+# Slot markers used when a template is shown as text
+SLOT_NAMES = ("{drug_a}", "{drug_b}")
+
+
+class DescriptionTemplate:
+    """Interaction description with the drug names cut out
+
+    `parts` are the literal text pieces and `slots` says which drug (0 = drug_a,
+    1 = drug_b) goes between consecutive parts, so len(parts) == len(slots) + 1.
+    """
+
+    __slots__ = ("parts", "slots")
+
+    def __init__(self, parts: Tuple[str, ...], slots: Tuple[int, ...]):
+        self.parts = parts
+        self.slots = slots
+
+    def render(self, drug_a: str, drug_b: str) -> str:
+        names = (drug_a, drug_b)
+        pieces = [self.parts[0]]
+        for slot, part in zip(self.slots, self.parts[1:]):
+            pieces.append(names[slot])
+            pieces.append(part)
+        return "".join(pieces)
+
+    @property
+    def text(self) -> str:
+        return self.render(*SLOT_NAMES)
+
+
+def split_description(description: str, drug_a: str, drug_b: str) -> Tuple[Tuple[str, ...], Tuple[int, ...]]:
+    """Cut every occurrence of either drug name out of a description"""
+    parts = []
+    slots = []
+    position = 0
+
+    while True:
+        best_index, best_slot, best_length = -1, -1, 0
+        for slot, name in enumerate((drug_a, drug_b)):
+            if not name:
+                continue
+            index = description.find(name, position)
+            # Earliest match wins; on a tie prefer the longer name ("Iron" vs "Iron sucrose")
+            if index != -1 and (best_index == -1 or index < best_index
+                                or (index == best_index and len(name) > best_length)):
+                best_index, best_slot, best_length = index, slot, len(name)
+        if best_index == -1:
+            break
+        parts.append(description[position:best_index])
+        slots.append(best_slot)
+        position = best_index + best_length
+
+    parts.append(description[position:])
+    return tuple(parts), tuple(slots)
+
+
+class InteractionStore:
+    """Interaction table stored as drug ids plus a template id per row
+
+    Rows are kept sorted by their order-independent pair key so every pair's
+    interactions are one contiguous range found with a binary search. Within a
+    pair, rows are ordered by descending severity code.
+    """
+
+    def __init__(self):
+        self.drugs = StringPool()
+        self.drug_a = np.empty(0, dtype=np.uint32)
+        self.drug_b = np.empty(0, dtype=np.uint32)
+        self.template_ids = np.empty(0, dtype=np.uint32)
+        self.severity = np.empty(0, dtype=np.int8)
+        self.template_severity = np.empty(0, dtype=np.int8)
+        self.pair_keys = np.empty(0, dtype=np.uint64)
+        self.templates: List[DescriptionTemplate] = []
+        # Case-insensitive drug name -> canonical id used in pair keys
+        self.drug_lookup: Dict[str, int] = {}
+        self.raw_description_bytes = 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "InteractionStore":
+        """Build a store from a db_drug_interactions dataframe read with dtype=str"""
+        store = cls()
+        count = len(df)
+        drug_a_names = df["Drug 1"] if "Drug 1" in df else pd.Series([""] * count)
+        drug_b_names = df["Drug 2"] if "Drug 2" in df else pd.Series([""] * count)
+        descriptions = df["Interaction Description"] if "Interaction Description" in df else pd.Series([""] * count)
+
+        drug_a = store._intern_drugs(drug_a_names)
+        drug_b = store._intern_drugs(drug_b_names)
+        template_ids = store._intern_templates(drug_a_names, drug_b_names, descriptions)
+        # What one Python str per row would have cost, for the memory report
+        store.raw_description_bytes = sum(sys.getsizeof(description) for description in descriptions)
+        store.drugs.seal()
+
+        canonical = np.fromiter(
+            (store._canonical_id(store.drugs[drug_id]) for drug_id in range(len(store.drugs))),
+            dtype=np.uint64, count=len(store.drugs)
+        )
+        first = canonical[drug_a]
+        second = canonical[drug_b]
+        pair_keys = (np.minimum(first, second) << np.uint64(32)) | np.maximum(first, second)
+
+        # Classify each distinct template once; every row inherits its template's code
+        store.template_severity = classify_severity(
+            pd.Series([template.text for template in store.templates], dtype=object)
+        )
+        severity = store.template_severity[template_ids]
+
+        # Primary key: pair; then most severe first; then original CSV order
+        order = np.lexsort((np.arange(count), -severity.astype(np.int16), pair_keys))
+        store.pair_keys = pair_keys[order]
+        store.drug_a = drug_a[order]
+        store.drug_b = drug_b[order]
+        store.template_ids = template_ids[order]
+        store.severity = severity[order]
+        return store
+
+    @classmethod
+    def from_segments(cls, segments: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> "InteractionStore":
+        """Rebuild a store over arrays produced by to_segments, e.g. memory-mapped read-only"""
+        store = cls()
+        store.drugs = FrozenStringPool(segments["drugs_blob"], segments["drugs_offsets"])
+        store.drug_a = segments["drug_a"]
+        store.drug_b = segments["drug_b"]
+        store.template_ids = segments["template_ids"]
+        store.severity = segments["severity"]
+        store.template_severity = segments["template_severity"]
+        store.pair_keys = segments["pair_keys"]
+        store.templates = [DescriptionTemplate(tuple(parts), tuple(slots)) for parts, slots in metadata["templates"]]
+        store.raw_description_bytes = metadata["raw_description_bytes"]
+        # Canonical ids are handed out in drug id order, so replaying them reproduces the pair keys
+        for drug_id in range(len(store.drugs)):
+            store._canonical_id(store.drugs[drug_id])
+        return store
+
+    def to_segments(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Arrays for a shared index directory plus the small JSON-serializable remainder"""
+        blob, offsets = self.drugs.to_arrays()
+        segments = {
+            "drugs_blob": blob,
+            "drugs_offsets": offsets,
+            "drug_a": self.drug_a,
+            "drug_b": self.drug_b,
+            "template_ids": self.template_ids,
+            "severity": self.severity,
+            "template_severity": self.template_severity,
+            "pair_keys": self.pair_keys,
+        }
+        metadata = {
+            "templates": [[list(template.parts), list(template.slots)] for template in self.templates],
+            "raw_description_bytes": self.raw_description_bytes,
+        }
+        return segments, metadata
+
+    def _intern_drugs(self, names: pd.Series) -> np.ndarray:
+        codes, uniques = pd.factorize(names, sort=False)
+        return self.drugs.intern_many(uniques)[codes]
+
+    def _intern_templates(self, drug_a_names: pd.Series, drug_b_names: pd.Series,
+                          descriptions: pd.Series) -> np.ndarray:
+        template_index: Dict[Tuple[Tuple[str, ...], Tuple[int, ...]], int] = {}
+        template_ids = np.empty(len(descriptions), dtype=np.uint32)
+
+        for row, (drug_a, drug_b, description) in enumerate(zip(drug_a_names, drug_b_names, descriptions)):
+            key = split_description(description, drug_a, drug_b)
+            template_id = template_index.get(key)
+            if template_id is None:
+                template_id = len(self.templates)
+                template_index[key] = template_id
+                self.templates.append(DescriptionTemplate(*key))
+            template_ids[row] = template_id
+
+        return template_ids
+
+    def _canonical_id(self, name: str) -> int:
+        return self.drug_lookup.setdefault(name.lower(), len(self.drug_lookup))
+
+    def canonical_names(self) -> List[str]:
+        """Each canonical id's drug name as the dataset writes it (its first spelling), indexed by id"""
+        names: List[Optional[str]] = [None] * len(self.drug_lookup)
+        for drug_id in range(len(self.drugs)):
+            name = self.drugs[drug_id]
+            canonical_id = self.drug_lookup[name.lower()]
+            if names[canonical_id] is None:
+                names[canonical_id] = name
+        return names
+
+    def pair_key(self, drug_a: str, drug_b: str) -> Optional[int]:
+        """Order-independent key for a pair of drug names, or None if either is unknown"""
+        first = self.drug_lookup.get(drug_a.lower())
+        second = self.drug_lookup.get(drug_b.lower())
+        if first is None or second is None:
+            return None
+        return (min(first, second) << 32) | max(first, second)
+
+    def rows_for_key(self, pair_key: int, min_severity: int = 0) -> range:
+        """Rows for a pair, keeping only those at or above min_severity"""
+        key = np.uint64(pair_key)
+        start = int(np.searchsorted(self.pair_keys, key, side="left"))
+        end = int(np.searchsorted(self.pair_keys, key, side="right"))
+        if min_severity:
+            # Rows are most severe first, so the qualifying ones are a prefix of the range
+            cut = start
+            while cut < end and self.severity[cut] >= min_severity:
+                cut += 1
+            end = cut
+        return range(start, end)
+
+    def description(self, row: int) -> str:
+        template = self.templates[self.template_ids[row]]
+        return template.render(self.drugs[self.drug_a[row]], self.drugs[self.drug_b[row]])
+
+    def interaction(self, row: int) -> DrugInteraction:
+        """Materialize one row, reconstructing its description from the template"""
+        return self._materialize(self.drug_a[row], self.drug_b[row], self.template_ids[row], self.severity[row])
+
+    def _materialize(self, drug_a_id: int, drug_b_id: int, template_id: int, severity: int) -> DrugInteraction:
+        drug_a = self.drugs[drug_a_id]
+        drug_b = self.drugs[drug_b_id]
+        return DrugInteraction(
+            drug_a=drug_a,
+            drug_b=drug_b,
+            interaction_level="",  # Placeholder since not available in CSV
+            description=self.templates[template_id].render(drug_a, drug_b),
+            severity=SEVERITY_LEVELS[severity],
+            recommendations=None,  # No recommendations available
+            template_id=int(template_id)
+        )
+
+    def template_counts(self) -> np.ndarray:
+        return np.bincount(self.template_ids, minlength=len(self.templates))
+
+    def severity_codes(self, rows: List[int]) -> np.ndarray:
+        return self.severity[rows]
+
+    def severity_counts(self, rows: List[int]) -> np.ndarray:
+        """Number of the given rows at each severity code"""
+        return np.bincount(self.severity_codes(rows), minlength=len(SEVERITY_LEVELS))
+
+    def pair_summary(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Every distinct pair key with its highest severity code and number of rows"""
+        keys, first_rows, counts = np.unique(self.pair_keys, return_index=True, return_counts=True)
+        # The first row of each pair is its most severe
+        return keys, np.asarray(self.severity)[first_rows], counts
+
+    def rows_for_template(self, template_id: int, limit: int) -> List[int]:
+        return np.flatnonzero(self.template_ids == template_id)[:limit].tolist()
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes held by the id arrays and template table versus the raw description strings"""
+        arrays = sum(array.nbytes for array in (self.drug_a, self.drug_b, self.template_ids,
+                                                self.severity, self.pair_keys))
+        template_bytes = sum(
+            sum(sys.getsizeof(part) for part in template.parts) + sys.getsizeof(template.slots)
+            for template in self.templates
+        )
+        return {
+            "arrays": arrays,
+            "templates": template_bytes,
+            "template_count": len(self.templates),
+            "drug_pool": self.drugs.nbytes(),
+            "raw_description_bytes": self.raw_description_bytes,
+        }
+
+    def __len__(self) -> int:
+        return len(self.template_ids)
+
+    def __iter__(self) -> Iterator[DrugInteraction]:
+        for row in range(len(self)):
+            yield self.interaction(row)
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from app.config import LLM_BATCH_WINDOW_MS, LLM_MAX_NEW_TOKENS, LLM_MAX_QUEUE, LLM_REQUEST_TIMEOUT_S
+from app.models.llm_backends import LLMBackend
+from app.models.llm_model import llm_model
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """The scheduler already holds its maximum number of waiting prompts"""
+
+
+class DeadlineExceededError(Exception):
+    """A prompt was not answered before its deadline"""
+
+
+class _Pending:
+    __slots__ = ("prompt", "max_new_tokens", "deadline", "future")
+
+    def __init__(self, prompt: str, max_new_tokens: int, deadline: float, future: asyncio.Future):
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.deadline = deadline
+        self.future = future
+
+
+class BatchScheduler:
+    """Coalesces concurrent generation requests into batched backend calls
+
+    The first waiting prompt opens a batching window of window_ms; everything
+    that arrives within it (up to the backend's max_batch_size) goes into the
+    same generate_batch call. Generation runs on one worker thread so the event
+    loop stays free, and batches run one at a time because a CPU model already
+    uses every core for one forward pass.
+
+    The queue is bounded: submit() fails fast with QueueFullError instead of
+    letting latency grow without limit, and prompts whose deadline passes while
+    queued are dropped before they cost a forward pass.
+    """
+
+    def __init__(self, backend_source: Callable[[], Optional[LLMBackend]],
+                 window_ms: float = LLM_BATCH_WINDOW_MS, max_queue: int = LLM_MAX_QUEUE):
+        self.backend_source = backend_source
+        self.window = window_ms / 1000
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Created by start() and shut down by stop(), so the scheduler can be started again
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.batches = 0
+        self.prompts = 0
+        self.rejected = 0
+        self.expired = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the batching loop; call from within the running event loop"""
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-batch")
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def submit(self, prompt: str, max_new_tokens: int = LLM_MAX_NEW_TOKENS,
+                     timeout: float = LLM_REQUEST_TIMEOUT_S) -> str:
+        """Queue a prompt and wait for its answer, at most timeout seconds in total"""
+        if self._queue is None:
+            raise RuntimeError("BatchScheduler.start() has not been called")
+        loop = asyncio.get_running_loop()
+        pending = _Pending(prompt, max_new_tokens, time.monotonic() + timeout, loop.create_future())
+        try:
+            self._queue.put_nowait(pending)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError(f"{self.max_queue} prompts already waiting")
+
+        try:
+            # shield() so a timeout leaves the future for the worker to notice as cancelled
+            return await asyncio.wait_for(asyncio.shield(pending.future), timeout)
+        except asyncio.TimeoutError:
+            pending.future.cancel()
+            self.expired += 1
+            raise DeadlineExceededError(f"no answer within {timeout:.1f}s")
+
+    async def _next_batch(self, max_batch_size: int) -> List[_Pending]:
+        batch = [await self._queue.get()]
+        window_closes = time.monotonic() + self.window
+        while len(batch) < max_batch_size:
+            remaining = window_closes - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            backend = self.backend_source()
+            batch = await self._next_batch(backend.max_batch_size if backend else 1)
+            now = time.monotonic()
+            # Requests that timed out while queued are not worth a forward pass
+            live = [pending for pending in batch if not pending.future.done() and pending.deadline > now]
+            if not live:
+                continue
+
+            backend = self.backend_source()
+            if backend is None:
+                for pending in live:
+                    pending.future.set_exception(RuntimeError("no LLM backend is loaded"))
+                continue
+
+            try:
+                answers = await loop.run_in_executor(
+                    self._executor, backend.generate_batch,
+                    [pending.prompt for pending in live], max(pending.max_new_tokens for pending in live)
+                )
+            except Exception as e:
+                logger.error(f"Batch generation failed for {len(live)} prompts: {e}")
+                self.failed += len(live)
+                for pending in live:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.prompts += len(live)
+            for pending, answer in zip(live, answers):
+                if not pending.future.done():
+                    pending.future.set_result(answer)
+            if len(answers) != len(live):
+                # Fail the prompts left without an answer now rather than let them wait for a 504
+                error = RuntimeError(f"{backend.name} backend returned {len(answers)} answers "
+                                     f"for {len(live)} prompts")
+                logger.error(str(error))
+                for pending in live[len(answers):]:
+                    self.failed += 1
+                    if not pending.future.done():
+                        pending.future.set_exception(error)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "batches": self.batches,
+            "prompts": self.prompts,
+            "mean_batch_size": round(self.prompts / self.batches, 2) if self.batches else 0.0,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "failed": self.failed,
+        }
+
+
+# Global scheduler; started with the application's event loop
+llm_scheduler = BatchScheduler(lambda: llm_model.backend)
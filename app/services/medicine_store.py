@@ -0,0 +1,277 @@
+import re
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from app.models.drug_model import Medicine
+from app.utils.string_pool import FrozenStringPool, StringPool
+
+# CSV column -> Medicine field stored as a pooled string column
+MEDICINE_COLUMNS = {
+    "Medicine Name": "name",
+    "Composition": "generic_name",
+    "Manufacturer": "manufacturer",
+    "Uses": "uses",
+    "Side_effects": "side_effects",
+}
+
+# Share of excellent reviews, used to rank autocomplete suggestions
+POPULARITY_COLUMN = "Excellent Review %"
+
+# Fields the CSV does not provide; they are never stored per row
+EMPTY_FIELDS = ("dosage_form", "strength", "precautions")
+
+
+# "Amoxycillin  (500mg) + Clavulanic Acid (125mg)" -> strength annotations to drop
+_STRENGTH_PATTERN = re.compile(r"\([^)]*\)")
+
+
+def parse_ingredients(composition: str) -> List[str]:
+    """Split a composition into lowercase ingredient names without strengths"""
+    ingredients = []
+    for part in _STRENGTH_PATTERN.sub("", composition).split("+"):
+        ingredient = " ".join(part.split()).lower()
+        if ingredient and ingredient not in ingredients:
+            ingredients.append(ingredient)
+    return ingredients
+
+
+class MedicineRecord:
+    """Lightweight read-only view of one row of a MedicineStore"""
+
+    __slots__ = ("_store", "row")
+
+    def __init__(self, store: "MedicineStore", row: int):
+        self._store = store
+        self.row = row
+
+    @property
+    def medicine_id(self) -> str:
+        return self._store.medicine_id(self.row)
+
+    @property
+    def name(self) -> str:
+        return self._store.value("name", self.row)
+
+    @property
+    def generic_name(self) -> str:
+        return self._store.value("generic_name", self.row)
+
+    @property
+    def manufacturer(self) -> str:
+        return self._store.value("manufacturer", self.row)
+
+    @property
+    def uses(self) -> str:
+        return self._store.value("uses", self.row)
+
+    @property
+    def side_effects(self) -> str:
+        return self._store.value("side_effects", self.row)
+
+    dosage_form = ""
+    strength = ""
+    precautions = ""
+
+    def to_model(self) -> Medicine:
+        """Materialize the row as a Medicine for API responses"""
+        return Medicine(
+            medicine_id=self.medicine_id,
+            name=self.name,
+            generic_name=self.generic_name,
+            dosage_form=self.dosage_form,
+            strength=self.strength,
+            manufacturer=self.manufacturer,
+            uses=self.uses,
+            side_effects=self.side_effects,
+            precautions=self.precautions
+        )
+
+    def __repr__(self) -> str:
+        return f"MedicineRecord(row={self.row}, name={self.name!r})"
+
+
+class _SortedNames:
+    """Sequence of lowercased medicine names in sorted order, decoded on access for bisect"""
+
+    def __init__(self, store: "MedicineStore"):
+        self._store = store
+
+    def __getitem__(self, index: int) -> str:
+        return self._store.value("name", int(self._store.name_order[index])).lower()
+
+    def __len__(self) -> int:
+        return len(self._store.name_order)
+
+
+class MedicineStore:
+    """Columnar medicine catalogue: one uint32 string-pool id per row and field"""
+
+    def __init__(self):
+        self.pool = StringPool()
+        self.columns: Dict[str, np.ndarray] = {
+            field: np.empty(0, dtype=np.uint32) for field in MEDICINE_COLUMNS.values()
+        }
+        # Only populated when the CSV ships its own ids; otherwise ids are derived from the name
+        self.medicine_ids: Optional[np.ndarray] = None
+        self.popularity = np.empty(0, dtype=np.uint8)
+        self.name_order = np.empty(0, dtype=np.int32)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "MedicineStore":
+        """Build a store from a Medicine_Details dataframe read with dtype=str"""
+        store = cls()
+        for csv_column, field in MEDICINE_COLUMNS.items():
+            values = df[csv_column].str.strip() if csv_column in df else pd.Series([""] * len(df))
+            store.columns[field] = store._intern_column(values)
+
+        if "medicine_id" in df:
+            store.medicine_ids = store._intern_column(df["medicine_id"])
+
+        if POPULARITY_COLUMN in df:
+            popularity = pd.to_numeric(df[POPULARITY_COLUMN], errors="coerce").fillna(0).clip(0, 100)
+            store.popularity = popularity.to_numpy(dtype=np.uint8)
+        else:
+            store.popularity = np.zeros(len(df), dtype=np.uint8)
+
+        store.pool.seal()
+        store._build_name_order()
+        return store
+
+    @classmethod
+    def from_segments(cls, segments: Dict[str, np.ndarray]) -> "MedicineStore":
+        """Rebuild a store over arrays produced by to_segments, e.g. memory-mapped read-only"""
+        store = cls()
+        store.pool = FrozenStringPool(segments["pool_blob"], segments["pool_offsets"])
+        store.columns = {field: segments[f"column_{field}"] for field in MEDICINE_COLUMNS.values()}
+        store.medicine_ids = segments.get("medicine_ids")
+        store.name_order = segments["name_order"]
+        store.popularity = segments["popularity"]
+        return store
+
+    def to_segments(self) -> Dict[str, np.ndarray]:
+        """Every array the store needs, for writing to a shared index directory"""
+        blob, offsets = self.pool.to_arrays()
+        segments = {
+            "pool_blob": blob,
+            "pool_offsets": offsets,
+            "name_order": self.name_order,
+            "popularity": self.popularity,
+        }
+        segments.update({f"column_{field}": column for field, column in self.columns.items()})
+        if self.medicine_ids is not None:
+            segments["medicine_ids"] = self.medicine_ids
+        return segments
+
+    def _intern_column(self, values: pd.Series) -> np.ndarray:
+        """Intern the distinct values of a column once and expand them back to row ids"""
+        codes, uniques = pd.factorize(values, sort=False)
+        return self.pool.intern_many(uniques)[codes]
+
+    def _build_name_order(self):
+        lowered = [self.pool[string_id].lower() for string_id in self.columns["name"]]
+        # Stable sort keeps duplicate names in row order so lookups can prefer the last row
+        self.name_order = np.array(sorted(range(len(lowered)), key=lowered.__getitem__), dtype=np.int32)
+
+    def value(self, field: str, row: int) -> str:
+        return self.pool[self.columns[field][row]]
+
+    def medicine_id(self, row: int) -> str:
+        """Return the CSV-provided id, or derive one from the name and row number"""
+        if self.medicine_ids is not None:
+            medicine_id = self.pool[self.medicine_ids[row]]
+            if medicine_id:
+                return medicine_id
+        # Create ID from medicine name by removing spaces and special chars
+        slug = ''.join(c for c in self.value("name", row).lower()
+                       if c.isalnum() or c.isspace()).replace(' ', '_')
+        return f"{slug}_{row}"
+
+    def find_by_name(self, name: str) -> Optional[MedicineRecord]:
+        """Exact, case-insensitive name lookup by binary search over the sorted names"""
+        key = name.lower()
+        position = bisect_right(_SortedNames(self), key) - 1
+        if position < 0:
+            return None
+        row = int(self.name_order[position])
+        if self.value("name", row).lower() != key:
+            return None
+        return MedicineRecord(self, row)
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """Names starting with prefix (case-insensitive), most popular first, then alphabetical"""
+        key = prefix.lower()
+        sorted_names = _SortedNames(self)
+        start = bisect_left(sorted_names, key)
+        end = bisect_left(sorted_names, key + chr(0x10FFFF), lo=start)
+        if start == end:
+            return []
+
+        # Positions in name_order are alphabetical ranks, so they break popularity ties
+        positions = np.arange(start, end)
+        rows = self.name_order[start:end]
+        ranked = positions[np.lexsort((positions, -self.popularity[rows].astype(np.int16)))]
+
+        completions = []
+        seen = set()
+        for position in ranked:
+            name = self.value("name", int(self.name_order[position]))
+            if name not in seen:
+                seen.add(name)
+                completions.append(name)
+                if len(completions) >= limit:
+                    break
+        return completions
+
+    def search(self, query: str, limit: int = 10) -> List[MedicineRecord]:
+        """Substring search over name and composition in catalogue order"""
+        query = query.lower()
+        names = self.columns["name"]
+        generic_names = self.columns["generic_name"]
+        # Check each distinct composition once instead of once per row
+        composition_hits: Dict[int, bool] = {}
+        results = []
+
+        for row in range(len(self)):
+            generic_id = int(generic_names[row])
+            if generic_id not in composition_hits:
+                composition_hits[generic_id] = query in self.pool[generic_id].lower()
+            if query in self.pool[names[row]].lower() or composition_hits[generic_id]:
+                results.append(MedicineRecord(self, row))
+                if len(results) >= limit:
+                    break
+
+        return results
+
+    def names(self) -> List[str]:
+        return [self.pool[string_id] for string_id in self.columns["name"]]
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes held by the column arrays, the name index and the string pool"""
+        columns = sum(column.nbytes for column in self.columns.values())
+        if self.medicine_ids is not None:
+            columns += self.medicine_ids.nbytes
+        return {
+            "columns": columns + self.popularity.nbytes,
+            "name_index": self.name_order.nbytes,
+            "string_pool": self.pool.nbytes(),
+            "distinct_strings": len(self.pool),
+        }
+
+    def __len__(self) -> int:
+        return len(self.columns["name"])
+
+    def __iter__(self) -> Iterator[MedicineRecord]:
+        for row in range(len(self)):
+            yield MedicineRecord(self, row)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[MedicineRecord, List[MedicineRecord]]:
+        if isinstance(index, slice):
+            return [MedicineRecord(self, row) for row in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("medicine index out of range")
+        return MedicineRecord(self, index)
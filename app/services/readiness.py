@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+# Optional subsystem whose data is not installed; not an error
+DISABLED = "disabled"
+
+
+class Readiness:
+    """Tracks the loading state of each subsystem so endpoints can fail fast while it loads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subsystems: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, *names: str):
+        """Declare subsystems that must load before their endpoints can serve"""
+        with self._lock:
+            for name in names:
+                self._subsystems.setdefault(name, {"state": PENDING})
+
+    def _set(self, name: str, **fields):
+        with self._lock:
+            self._subsystems.setdefault(name, {}).update(fields)
+
+    @contextmanager
+    def track(self, name: str):
+        """Mark a subsystem loading for the duration of the block, then ready or failed"""
+        started = time.perf_counter()
+        self._set(name, state=LOADING, error=None)
+        try:
+            yield
+        except Exception as e:
+            self._set(name, state=FAILED, error=str(e))
+            raise
+        seconds = round(time.perf_counter() - started, 3)
+        self._set(name, state=READY, load_seconds=seconds)
+        logger.info(f"{name} ready in {seconds}s")
+
+    def run(self, name: str, func: Callable, *args, **kwargs) -> Optional[Any]:
+        """Run a loader under track(), logging instead of raising so background threads stay quiet"""
+        try:
+            with self.track(name):
+                return func(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Error loading {name}: {e}")
+            return None
+
+    def fail(self, name: str, error):
+        """Mark a subsystem that will never load, e.g. because what it depends on failed"""
+        self._set(name, state=FAILED, error=str(error))
+
+    def disable(self, name: str, reason: str):
+        """Mark an optional subsystem off, e.g. because its data is not installed or another process handles it"""
+        self._set(name, state=DISABLED, error=None, reason=reason)
+        logger.info(f"{name} disabled: {reason}")
+
+    def is_ready(self, name: str) -> bool:
+        with self._lock:
+            return self._subsystems.get(name, {}).get("state") == READY
+
+    def are_ready(self, *names: str) -> bool:
+        return all(self.is_ready(name) for name in names)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(info) for name, info in self._subsystems.items()}
+
+    def require(self, *names: str) -> Callable:
+        """FastAPI dependency that answers 503 until every named subsystem is ready"""
+        async def dependency():
+            for name in names:
+                if not self.is_ready(name):
+                    with self._lock:
+                        info = dict(self._subsystems.get(name, {}))
+                    state = info.get("state", PENDING)
+                    # Both are terminal until the server restarts, so no Retry-After
+                    if state == FAILED:
+                        raise HTTPException(status_code=503, detail=f"{name} failed to load: {info.get('error')}")
+                    if state == DISABLED:
+                        raise HTTPException(status_code=503, detail=f"{name} is disabled: {info.get('reason')}")
+                    raise HTTPException(
+                        status_code=503,
+                        detail=f"{name} is {state}, try again shortly",
+                        headers={"Retry-After": "2"}
+                    )
+        return dependency
+
+
+# Global readiness registry
+readiness = Readiness()
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# Index in this tuple is the compact severity code stored per interaction
+SEVERITY_LEVELS = ("unknown", "low", "moderate", "high")
+SEVERITY_CODES = {level: code for code, level in enumerate(SEVERITY_LEVELS)}
+
+# Bump when SEVERITY_RULES change: it is part of the dataset version, so stored severities are rebuilt
+SEVERITY_RULES_VERSION = 3
+
+
+def _increased(activities: str) -> str:
+    """Match "increase(s) the <term> ... activities" only; a decrease of the same activity is low"""
+    return rf"increases? the (?:{activities})"
+
+
+# Checked from the highest level down; the first level whose pattern matches wins,
+# so "risk or severity of bleeding" is high even though "risk or severity" is moderate.
+# Terms are anchored at a word start so "antihypertensive" does not count as "hypertensive".
+# Adverse events count in either direction, but "<term> activities" only when increased:
+# "may decrease the cardiotoxic activities" falls through to the low rule.
+SEVERITY_RULES = (
+    ("high", (
+        _increased(
+            r"qtc[- ]prolong|anticoagulant|thrombogenic|cardiotoxic|arrhythmogenic|respiratory depress"
+            r"|cns depress|central nervous system depress|neuromuscular block|nephrotoxic|hepatotoxic"
+            r"|neurotoxic|ototoxic|myopathic|hyperkalemi|myelosuppress|methemoglobinemi"
+        )
+        + r"|serotonin syndrome|qtc[- ]prolongation|torsade|bleeding|hemorrhag|ventricular arrhythmia"
+        r"|cardiotoxicity|nephrotoxicity|hepatotoxicity|neurotoxicity|ototoxicity|myopathy|rhabdomyolysis"
+        r"|respiratory depression|cns depression|central nervous system depression|neuromuscular blockade"
+        r"|hyperkalemia|lactic acidosis|myelosuppression|agranulocytosis|methemoglobinemia"
+        r"|neuroleptic malignant|seizure|convulsi|contraindicated"
+    )),
+    ("moderate", (
+        _increased(
+            r"hypotensive|hypertensive|hypoglycemic|hyperglycemic|sedative|anticholinergic|bradycardic"
+            r"|tachycardic|orthostatic|vasoconstrict|fluid retaining|immunosuppressive"
+        )
+        + r"|risk or severity of|serum concentration of .* can be increased|higher serum level"
+        r"|metabolism of .* can be decreased|excretion .* can be decreased|decrease the excretion"
+        r"|therapeutic efficacy of .* can be decreased"
+    )),
+    ("low", (
+        r"absorption|serum concentration of .* can be decreased|lower serum level"
+        r"|metabolism of .* can be increased|excretion .* can be increased|increase the excretion"
+        r"|therapeutic efficacy of .* can be increased|photosensitizing|may decrease the .* activities"
+    )),
+)
+
+
+def classify_severity(descriptions: pd.Series) -> np.ndarray:
+    """Assign a severity code to every description with keyword rules, one vectorized pass per level"""
+    lowered = descriptions.str.lower()
+    codes = np.zeros(len(descriptions), dtype=np.int8)
+
+    for level, pattern in SEVERITY_RULES:
+        matches = lowered.str.contains(rf"\b(?:{pattern})", regex=True).to_numpy(dtype=bool)
+        codes[matches & (codes == 0)] = SEVERITY_CODES[level]
+
+    return codes
+
+
+def severity_code(level: str) -> int:
+    """Code for a severity name, case-insensitive"""
+    return SEVERITY_CODES[level.lower()]
@@ -0,0 +1,516 @@
+"""
+SQLite storage backend for low-memory devices.
+
+Instead of parsing the CSVs into RAM, the medicine catalogue and the interaction
+table live in one prebuilt SQLite file. Only the drug name table and the
+description templates are kept in memory; everything else is read on demand
+through a small, bounded page cache.
+
+    python -m app.services.sqlite_backend build            # CSVs -> app/data/mediguide.db
+    python -m app.services.sqlite_backend bench            # compare with the in-memory backend
+
+Select it at startup with MEDIGUIDE_STORAGE_BACKEND=sqlite.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.config import SQLITE_CACHE_KB, SQLITE_DB_FILE, SQLITE_MMAP_BYTES
+from app.models.drug_model import DrugInteraction, Medicine
+from app.services.data_loader import DataLoader
+from app.services.index_segments import dataset_version, source_fingerprint, source_modified
+from app.services.interaction_store import DescriptionTemplate, InteractionStore
+from app.services.readiness import readiness
+from app.utils.helpers import format_bytes, get_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+DATABASE_FORMAT_VERSION = 2
+
+# FTS5's trigram tokenizer cannot match anything shorter than three characters
+MIN_FTS_QUERY = 3
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+
+CREATE TABLE medicines (
+    row INTEGER PRIMARY KEY,
+    medicine_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    generic_name TEXT NOT NULL,
+    manufacturer TEXT NOT NULL,
+    uses TEXT NOT NULL,
+    side_effects TEXT NOT NULL,
+    popularity INTEGER NOT NULL
+);
+-- Covers prefix completion without touching the table rows
+CREATE INDEX medicines_name_lower ON medicines (name_lower, popularity, name);
+
+CREATE VIRTUAL TABLE medicines_fts USING fts5(
+    name, generic_name, uses,
+    content='medicines', content_rowid='row', tokenize='trigram'
+);
+
+CREATE TABLE drugs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+
+CREATE TABLE templates (
+    id INTEGER PRIMARY KEY,
+    parts TEXT NOT NULL,
+    slots TEXT NOT NULL,
+    interaction_count INTEGER NOT NULL
+);
+
+-- Rows keep the in-memory store's order: by pair key, most severe first
+CREATE TABLE interactions (
+    row INTEGER PRIMARY KEY,
+    pair_key INTEGER NOT NULL,
+    drug_a INTEGER NOT NULL,
+    drug_b INTEGER NOT NULL,
+    template_id INTEGER NOT NULL,
+    severity INTEGER NOT NULL
+);
+CREATE INDEX interactions_pair ON interactions (pair_key, severity);
+CREATE INDEX interactions_template ON interactions (template_id);
+"""
+
+
+def build_database(db_path: Path = SQLITE_DB_FILE) -> Path:
+    """Parse the CSVs with the in-memory loader and write them to a fresh SQLite file"""
+    db_path = Path(db_path)
+    loader = DataLoader()
+    loader.load_data()
+    medicines = loader.medicines
+    interactions = loader.drug_interactions
+
+    staging_path = db_path.with_name(db_path.name + ".tmp")
+    staging_path.unlink(missing_ok=True)
+    conn = sqlite3.connect(staging_path)
+    try:
+        conn.executescript(SCHEMA)
+        with conn:
+            conn.executemany(
+                "INSERT INTO medicines VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((row, record.medicine_id, record.name, record.name.lower(), record.generic_name,
+                  record.manufacturer, record.uses, record.side_effects, int(medicines.popularity[row]))
+                 for row, record in enumerate(medicines))
+            )
+            conn.execute("INSERT INTO medicines_fts (medicines_fts) VALUES ('rebuild')")
+
+            conn.executemany(
+                "INSERT INTO drugs VALUES (?, ?)",
+                ((drug_id, interactions.drugs[drug_id]) for drug_id in range(len(interactions.drugs)))
+            )
+            counts = interactions.template_counts()
+            conn.executemany(
+                "INSERT INTO templates VALUES (?, ?, ?, ?)",
+                ((template_id, json.dumps(template.parts), json.dumps(template.slots), int(counts[template_id]))
+                 for template_id, template in enumerate(interactions.templates))
+            )
+            conn.executemany(
+                "INSERT INTO interactions VALUES (?, ?, ?, ?, ?, ?)",
+                zip(range(len(interactions)), interactions.pair_keys.tolist(), interactions.drug_a.tolist(),
+                    interactions.drug_b.tolist(), interactions.template_ids.tolist(),
+                    interactions.severity.tolist())
+            )
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", (
+                ("format", str(DATABASE_FORMAT_VERSION)),
+                ("sources", json.dumps(source_fingerprint())),
+                ("dataset_version", dataset_version()),
+                ("data_modified", repr(source_modified())),
+                ("medicine_count", str(len(medicines))),
+                ("interaction_count", str(len(interactions))),
+            ))
+        conn.execute("ANALYZE")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    os.replace(staging_path, db_path)
+    logger.info(f"Wrote {len(medicines)} medicines and {len(interactions)} interactions to {db_path} "
+                f"({format_bytes(db_path.stat().st_size)})")
+    return db_path
+
+
+class SQLiteConnections:
+    """One read-only connection per thread, each with a bounded page cache"""
+
+    def __init__(self, db_path: Path, cache_kb: int = SQLITE_CACHE_KB, mmap_bytes: int = SQLITE_MMAP_BYTES):
+        self.db_path = Path(db_path)
+        self.cache_kb = cache_kb
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True)
+            # Negative cache_size is in KiB; mmap lets every worker share the OS page cache
+            conn.execute(f"PRAGMA cache_size = -{self.cache_kb}")
+            conn.execute(f"PRAGMA mmap_size = {self.mmap_bytes}")
+            conn.execute("PRAGMA query_only = ON")
+            conn.execute("PRAGMA temp_store = MEMORY")
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql: str, parameters=()) -> sqlite3.Cursor:
+        return self.get().execute(sql, parameters)
+
+    def meta(self, key: str) -> Optional[str]:
+        row = self.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+
+class SQLiteMedicineRecord:
+    """One medicines row fetched from the database, shaped like MedicineRecord"""
+
+    __slots__ = ("row", "medicine_id", "name", "generic_name", "manufacturer", "uses", "side_effects")
+
+    FIELDS = "row, medicine_id, name, generic_name, manufacturer, uses, side_effects"
+
+    def __init__(self, row: int, medicine_id: str, name: str, generic_name: str,
+                 manufacturer: str, uses: str, side_effects: str):
+        self.row = row
+        self.medicine_id = medicine_id
+        self.name = name
+        self.generic_name = generic_name
+        self.manufacturer = manufacturer
+        self.uses = uses
+        self.side_effects = side_effects
+
+    dosage_form = ""
+    strength = ""
+    precautions = ""
+
+    def to_model(self) -> Medicine:
+        """Materialize the row as a Medicine for API responses"""
+        return Medicine(
+            medicine_id=self.medicine_id,
+            name=self.name,
+            generic_name=self.generic_name,
+            dosage_form=self.dosage_form,
+            strength=self.strength,
+            manufacturer=self.manufacturer,
+            uses=self.uses,
+            side_effects=self.side_effects,
+            precautions=self.precautions
+        )
+
+    def __repr__(self) -> str:
+        return f"SQLiteMedicineRecord(row={self.row}, name={self.name!r})"
+
+
+class SQLiteMedicineStore:
+    """MedicineStore lookups answered by the medicines table and its FTS5 index"""
+
+    def __init__(self, connections: SQLiteConnections):
+        self.connections = connections
+        self._count = int(connections.meta("medicine_count") or 0)
+
+    def _records(self, sql: str, parameters=()) -> List[SQLiteMedicineRecord]:
+        return [SQLiteMedicineRecord(*row) for row in self.connections.execute(sql, parameters)]
+
+    def find_by_name(self, name: str) -> Optional[SQLiteMedicineRecord]:
+        """Exact, case-insensitive name lookup; the last duplicate wins, as in MedicineStore"""
+        records = self._records(
+            f"SELECT {SQLiteMedicineRecord.FIELDS} FROM medicines WHERE name_lower = ? ORDER BY row DESC LIMIT 1",
+            (name.lower(),)
+        )
+        return records[0] if records else None
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """Names starting with prefix (case-insensitive), most popular first, then alphabetical"""
+        key = prefix.lower()
+        completions = []
+        seen = set()
+        rows = self.connections.execute(
+            "SELECT name FROM medicines WHERE name_lower >= ? AND name_lower < ? "
+            "ORDER BY popularity DESC, name_lower, row",
+            (key, key + chr(0x10FFFF))
+        )
+        for (name,) in rows:
+            if name not in seen:
+                seen.add(name)
+                completions.append(name)
+                if len(completions) >= limit:
+                    break
+        return completions
+
+    def search(self, query: str, limit: int = 10) -> List[SQLiteMedicineRecord]:
+        """Substring search over name and composition in catalogue order"""
+        if len(query) >= MIN_FTS_QUERY:
+            # A quoted trigram query is a case-insensitive substring match, like the in-memory search
+            phrase = '"' + query.replace('"', '""') + '"'
+            return self._records(
+                f"SELECT {SQLiteMedicineRecord.FIELDS} FROM medicines WHERE row IN "
+                f"(SELECT rowid FROM medicines_fts WHERE medicines_fts MATCH ?) ORDER BY row LIMIT ?",
+                ("{name generic_name} : " + phrase, limit)
+            )
+        key = query.lower()
+        return self._records(
+            f"SELECT {SQLiteMedicineRecord.FIELDS} FROM medicines "
+            f"WHERE instr(name_lower, ?) > 0 OR instr(lower(generic_name), ?) > 0 ORDER BY row LIMIT ?",
+            (key, key, limit)
+        )
+
+    def names(self) -> List[str]:
+        return [name for (name,) in self.connections.execute("SELECT name FROM medicines ORDER BY row")]
+
+    def memory_usage(self) -> Dict[str, int]:
+        """On-disk size of the database against the page cache a connection may use"""
+        return {
+            "database_bytes": self.connections.db_path.stat().st_size,
+            "page_cache_limit": self.connections.cache_kb * 1024,
+        }
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[SQLiteMedicineRecord]:
+        for row in self.connections.execute(
+                f"SELECT {SQLiteMedicineRecord.FIELDS} FROM medicines ORDER BY row"):
+            yield SQLiteMedicineRecord(*row)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[SQLiteMedicineRecord, List[SQLiteMedicineRecord]]:
+        if isinstance(index, slice):
+            rows = range(len(self))[index]
+            if rows.step != 1:
+                return [self[row] for row in rows]
+            return self._records(
+                f"SELECT {SQLiteMedicineRecord.FIELDS} FROM medicines WHERE row >= ? AND row < ? ORDER BY row",
+                (rows.start, rows.stop)
+            )
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("medicine index out of range")
+        return self._records(f"SELECT {SQLiteMedicineRecord.FIELDS} FROM medicines WHERE row = ?", (index,))[0]
+
+
+class SQLiteInteractionStore(InteractionStore):
+    """InteractionStore whose rows stay in the interactions table
+
+    Drug names and templates are small and kept in memory, so pair keys and
+    descriptions are computed exactly as the in-memory store does.
+    """
+
+    def __init__(self, connections: SQLiteConnections):
+        super().__init__()
+        self.connections = connections
+        self.drugs = [name for (name,) in connections.execute("SELECT name FROM drugs ORDER BY id")]
+        for name in self.drugs:
+            self._canonical_id(name)
+        self._template_counts = []
+        for parts, slots, count in connections.execute(
+                "SELECT parts, slots, interaction_count FROM templates ORDER BY id"):
+            self.templates.append(DescriptionTemplate(tuple(json.loads(parts)), tuple(json.loads(slots))))
+            self._template_counts.append(count)
+        self._count = int(connections.meta("interaction_count") or 0)
+
+    def rows_for_key(self, pair_key: int, min_severity: int = 0) -> List[int]:
+        """Rows for a pair, keeping only those at or above min_severity"""
+        return [row for (row,) in self.connections.execute(
+            "SELECT row FROM interactions WHERE pair_key = ? AND severity >= ? ORDER BY row",
+            (pair_key, min_severity)
+        )]
+
+    def _fetch(self, row: int):
+        fetched = self.connections.execute(
+            "SELECT drug_a, drug_b, template_id, severity FROM interactions WHERE row = ?", (row,)
+        ).fetchone()
+        if fetched is None:
+            raise IndexError("interaction index out of range")
+        return fetched
+
+    def description(self, row: int) -> str:
+        drug_a, drug_b, template_id, _ = self._fetch(row)
+        return self.templates[template_id].render(self.drugs[drug_a], self.drugs[drug_b])
+
+    def interaction(self, row: int) -> DrugInteraction:
+        return self._materialize(*self._fetch(row))
+
+    def template_counts(self) -> np.ndarray:
+        return np.array(self._template_counts, dtype=np.int64)
+
+    def severity_codes(self, rows: List[int]) -> np.ndarray:
+        if not rows:
+            return np.empty(0, dtype=np.int8)
+        placeholders = ",".join("?" * len(rows))
+        codes = dict(self.connections.execute(
+            f"SELECT row, severity FROM interactions WHERE row IN ({placeholders})", list(rows)
+        ))
+        return np.array([codes[row] for row in rows], dtype=np.int8)
+
+    def pair_summary(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        fetched = self.connections.execute(
+            "SELECT pair_key, MAX(severity), COUNT(*) FROM interactions GROUP BY pair_key ORDER BY pair_key"
+        ).fetchall()
+        keys, severity, counts = zip(*fetched) if fetched else ((), (), ())
+        return (np.array(keys, dtype=np.uint64), np.array(severity, dtype=np.int8),
+                np.array(counts, dtype=np.int64))
+
+    def rows_for_template(self, template_id: int, limit: int) -> List[int]:
+        return [row for (row,) in self.connections.execute(
+            "SELECT row FROM interactions WHERE template_id = ? ORDER BY row LIMIT ?", (template_id, limit)
+        )]
+
+    def memory_usage(self) -> Dict[str, int]:
+        return {
+            "template_count": len(self.templates),
+            "drug_count": len(self.drugs),
+            "database_bytes": self.connections.db_path.stat().st_size,
+        }
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[DrugInteraction]:
+        for fetched in self.connections.execute(
+                "SELECT drug_a, drug_b, template_id, severity FROM interactions ORDER BY row"):
+            yield self._materialize(*fetched)
+
+
+class SQLiteDataLoader(DataLoader):
+    """DataLoader that opens a prebuilt SQLite file instead of loading the CSVs into RAM"""
+
+    def __init__(self, db_path: Path = SQLITE_DB_FILE):
+        super().__init__()
+        self.db_path = Path(db_path)
+
+    def load_data(self):
+        """Open the database read-only; only drug names and templates are read up front"""
+        try:
+            rss_before = get_rss_bytes()
+            with readiness.track("medicines"), readiness.track("interactions"):
+                if not self.db_path.exists():
+                    raise FileNotFoundError(
+                        f"{self.db_path} not found; build it with python -m app.services.sqlite_backend build"
+                    )
+                connections = SQLiteConnections(self.db_path)
+                if connections.meta("format") != str(DATABASE_FORMAT_VERSION):
+                    raise ValueError(f"Unsupported database format in {self.db_path}, rebuild it")
+                if connections.meta("sources") != json.dumps(source_fingerprint()):
+                    logger.warning(f"{self.db_path} was built from different CSVs or severity rules; consider rebuilding it")
+                self.medicines = SQLiteMedicineStore(connections)
+                self.drug_interactions = SQLiteInteractionStore(connections)
+                self.dataset_version = connections.meta("dataset_version")
+                self.data_modified = float(connections.meta("data_modified"))
+            logger.info(
+                f"Opened {len(self.medicines)} medicines and {len(self.drug_interactions)} interactions "
+                f"from {self.db_path}; RSS {format_bytes(rss_before)} -> {format_bytes(get_rss_bytes())}"
+            )
+        except Exception as e:
+            logger.error(f"Error opening SQLite database: {e}")
+            raise
+
+    def attach(self, index_dir: Path):
+        # Every worker opens the same read-only file; the shared segments are not needed
+        self.load_data()
+
+
+def _benchmark_backend(backend: str, db_path: str, workload: Dict[str, List[Any]]) -> Dict[str, Any]:
+    """Load one backend in this (fresh) process and time the DataLoader calls"""
+    rss_before = get_rss_bytes()
+    started = time.perf_counter()
+    loader = SQLiteDataLoader(Path(db_path)) if backend == "sqlite" else DataLoader()
+    loader.load_data()
+    result = {
+        "backend": backend,
+        "load_seconds": time.perf_counter() - started,
+        "rss_growth": (get_rss_bytes() or 0) - (rss_before or 0),
+    }
+    operations = {
+        "get_medicine_by_name": lambda name: loader.get_medicine_by_name(name),
+        "search_medicines": lambda query: loader.search_medicines(query, 10),
+        "autocomplete_medicines": lambda prefix: loader.autocomplete_medicines(prefix, 10),
+        "find_interactions": lambda regimen: loader.find_interactions(regimen),
+    }
+    for operation, call in operations.items():
+        timings = []
+        for argument in workload[operation]:
+            start = time.perf_counter()
+            call(argument)
+            timings.append((time.perf_counter() - start) * 1e6)
+        timings.sort()
+        result[operation] = {
+            "mean_us": statistics.fmean(timings),
+            "p95_us": timings[int(len(timings) * 0.95)],
+        }
+    result["rss_after_queries"] = (get_rss_bytes() or 0) - (rss_before or 0)
+    return result
+
+
+def _workload(db_path: Path, samples: int, seed: int) -> Dict[str, List[Any]]:
+    """Random names, prefixes and regimens drawn from the database itself"""
+    conn = sqlite3.connect(db_path)
+    try:
+        names = [name for (name,) in conn.execute("SELECT name FROM medicines")]
+        drugs = [name for (name,) in conn.execute("SELECT name FROM drugs")]
+    finally:
+        conn.close()
+    rng = random.Random(seed)
+    picked = [rng.choice(names) for _ in range(samples)]
+    return {
+        "get_medicine_by_name": picked,
+        "search_medicines": [name.split()[0][:5] for name in picked],
+        "autocomplete_medicines": [name[:3] for name in picked],
+        "find_interactions": [rng.sample(drugs, min(4, len(drugs))) for _ in range(samples)],
+    }
+
+
+def benchmark(db_path: Path = SQLITE_DB_FILE, samples: int = 200, seed: int = 0) -> List[Dict[str, Any]]:
+    """Compare both backends, each loaded in its own process so memory figures are not shared"""
+    workload = _workload(db_path, samples, seed)
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for backend in ("memory", "sqlite"):
+        with context.Pool(1) as pool:
+            results.append(pool.apply(_benchmark_backend, (backend, str(db_path), workload)))
+    return results
+
+
+def _print_benchmark(results: List[Dict[str, Any]]):
+    print(f"{'':26}" + "".join(f"{result['backend']:>22}" for result in results))
+    print(f"{'load time':26}" + "".join(f"{result['load_seconds'] * 1000:>19.1f} ms" for result in results))
+    print(f"{'RSS after load':26}" + "".join(f"{format_bytes(result['rss_growth']):>22}" for result in results))
+    print(f"{'RSS after queries':26}" + "".join(f"{format_bytes(result['rss_after_queries']):>22}"
+                                                for result in results))
+    for operation in ("get_medicine_by_name", "search_medicines", "autocomplete_medicines", "find_interactions"):
+        print(f"{operation:26}" + "".join(
+            f"{result[operation]['mean_us']:>10.0f} / {result[operation]['p95_us']:>6.0f} us" for result in results
+        ))
+    print("(operation rows: mean / p95 per call)")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build or benchmark the SQLite storage backend")
+    parser.add_argument("command", choices=("build", "bench"))
+    parser.add_argument("--db", type=Path, default=SQLITE_DB_FILE)
+    parser.add_argument("--samples", type=int, default=200, help="Calls per operation when benchmarking")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_database(args.db)
+    else:
+        if not args.db.exists():
+            build_database(args.db)
+        _print_benchmark(benchmark(args.db, args.samples))
+
+
+if __name__ == "__main__":
+    main()
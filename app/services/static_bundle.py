@@ -0,0 +1,164 @@
+"""
+Static search bundle for the frontend.
+
+Exports medicine names and compositions plus every interacting drug pair as
+small gzip-compressed JSON shards, keyed by the first two characters of a word
+or drug name, under frontend/bundle/<dataset version>/. The frontend fetches
+bundle/manifest.json, then only the shards a query needs, and answers search and
+interaction pre-checks without a server round trip:
+
+    python -m app.services.static_bundle
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import string
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+from app.config import STATIC_BUNDLE_DIR
+from app.services.data_loader import create_data_loader
+from app.services.index_segments import dataset_version
+from app.services.severity import SEVERITY_LEVELS
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+SHARD_KEY_LENGTH = 2
+
+_SHARD_CHARACTERS = set(string.ascii_lowercase + string.digits)
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def shard_key(text: str) -> str:
+    """First characters of text, lowercased, with anything but a-z and 0-9 as "_"
+
+    frontend/offline_index.js computes the same key, so both sides must change together.
+    """
+    prefix = text.lower()[:SHARD_KEY_LENGTH].ljust(SHARD_KEY_LENGTH, "_")
+    return "".join(c if c in _SHARD_CHARACTERS else "_" for c in prefix)
+
+
+def _write_shards(shards: Dict[str, object], directory: Path, url_prefix: str) -> Dict[str, str]:
+    directory.mkdir(parents=True)
+    files = {}
+    for key, content in sorted(shards.items()):
+        path = directory / f"{key}.json.gz"
+        # mtime=0 keeps the bytes identical for identical data, so reruns are reproducible
+        with open(path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write(json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        files[key] = f"{url_prefix}/{path.name}"
+    return files
+
+
+def medicine_shards(medicines) -> Dict[str, List[list]]:
+    """[row, name, composition] for every medicine, under each distinct word prefix it contains"""
+    shards: Dict[str, List[list]] = defaultdict(list)
+    for record in medicines:
+        name, composition = record.name, record.generic_name
+        keys = {shard_key(word) for word in _WORD_PATTERN.findall(f"{name} {composition}".lower())}
+        for key in keys:
+            shards[key].append([record.row, name, composition])
+    return shards
+
+
+def interaction_shards(interactions) -> Dict[str, Dict[str, List[list]]]:
+    """For each drug, its partners as [partner, highest severity code, interaction count]"""
+    names = {canonical_id: name for name, canonical_id in interactions.drug_lookup.items()}
+    keys, severity, counts = interactions.pair_summary()
+    shards: Dict[str, Dict[str, List[list]]] = defaultdict(lambda: defaultdict(list))
+    for key, code, count in zip(keys.tolist(), severity.tolist(), counts.tolist()):
+        first, second = names[key >> 32], names[key & 0xFFFFFFFF]
+        # Stored under both drugs so a check only loads the shards of the drugs it names
+        shards[shard_key(first)][first].append([second, code, count])
+        if second != first:
+            shards[shard_key(second)][second].append([first, code, count])
+    return shards
+
+
+def read_bundle_manifest(bundle_dir: Path = STATIC_BUNDLE_DIR) -> Dict:
+    with open(Path(bundle_dir) / MANIFEST_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def export_bundle(medicines, interactions, bundle_dir: Path = STATIC_BUNDLE_DIR) -> Dict:
+    """Write a bundle for the current dataset version and point the manifest at it"""
+    bundle_dir = Path(bundle_dir)
+    version = dataset_version()
+    # Per-process staging name, so concurrent exports never write into each other's files
+    staging_dir = bundle_dir / f"{version}.{os.getpid()}.tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    staging_dir.mkdir(parents=True)
+
+    medicine_files = _write_shards(medicine_shards(medicines), staging_dir / "medicines", f"{version}/medicines")
+    interaction_groups = interaction_shards(interactions)
+    interaction_files = _write_shards(interaction_groups, staging_dir / "interactions",
+                                      f"{version}/interactions")
+
+    manifest = {
+        "format": BUNDLE_FORMAT_VERSION,
+        "version": version,
+        "shard_key_length": SHARD_KEY_LENGTH,
+        "severity_levels": list(SEVERITY_LEVELS),
+        "medicine_count": len(medicines),
+        "drug_count": sum(len(drugs) for drugs in interaction_groups.values()),
+        # Paths are relative to the bundle directory and change with every dataset version
+        "medicines": medicine_files,
+        "interactions": interaction_files,
+    }
+
+    version_dir = bundle_dir / version
+    try:
+        staging_dir.rename(version_dir)
+    except OSError:
+        # Already exported, possibly by a concurrent exporter that won the rename. Same version
+        # means same content, so keep the copy clients may already be reading
+        if not version_dir.is_dir():
+            raise
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    manifest_tmp = bundle_dir / f"{MANIFEST_FILE}.{os.getpid()}.tmp"
+    with open(manifest_tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_tmp, bundle_dir / MANIFEST_FILE)
+
+    # Old versions are unreachable once the manifest moves on
+    for path in bundle_dir.iterdir():
+        if path.is_dir() and path.name != version and not path.name.endswith(".tmp"):
+            shutil.rmtree(path, ignore_errors=True)
+
+    size = sum(path.stat().st_size for path in version_dir.rglob("*.gz"))
+    logger.info(f"Exported static bundle {version}: {len(medicine_files)} medicine and "
+                f"{len(interaction_files)} interaction shards, {size / 1024:.1f} KB compressed")
+    return manifest
+
+
+def ensure_bundle(medicines, interactions, bundle_dir: Path = STATIC_BUNDLE_DIR) -> Dict:
+    """Export a bundle unless the one on disk already matches the dataset version"""
+    try:
+        manifest = read_bundle_manifest(bundle_dir)
+        if manifest.get("format") == BUNDLE_FORMAT_VERSION and manifest.get("version") == dataset_version():
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return export_bundle(medicines, interactions, bundle_dir)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Export the frontend's offline search bundle")
+    parser.add_argument("--bundle-dir", type=Path, default=STATIC_BUNDLE_DIR)
+    args = parser.parse_args()
+
+    loader = create_data_loader()
+    loader.load_data()
+    export_bundle(loader.medicines, loader.drug_interactions, args.bundle_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.config import WIKIPEDIA_DATA_DIR
+from app.models.drug_model import WikipediaReference
+from app.services.data_loader import data_loader
+from app.services.medicine_store import parse_ingredients
+
+logger = logging.getLogger(__name__)
+
+LINKS_FORMAT_VERSION = 1
+LINKS_FILE = "medicine_links.npz"
+SUMMARIES_FILE = "medical_summaries.json"
+# Written by MedicalZIMProcessor.process_articles: redirect title -> target article id
+REDIRECTS_FILE = "redirects.json"
+MAX_REFERENCES = 3
+
+# Match scores; a salt-stripped ingredient ("metformin" from "metformin hydrochloride") scores one less
+SCORE_TITLE = 4
+SCORE_REDIRECT = 3
+SCORE_QUALIFIED_TITLE = 3
+
+_SALT_WORDS = {
+    "hydrochloride", "hcl", "hydrobromide", "sodium", "potassium", "calcium", "magnesium", "sulphate",
+    "sulfate", "maleate", "citrate", "acetate", "phosphate", "tartrate", "succinate", "fumarate",
+    "mesylate", "besylate", "besilate", "bromide", "chloride", "dihydrate", "monohydrate", "trihydrate",
+}
+_QUALIFIER_PATTERN = re.compile(r"\s*\([^)]*\)\s*$")
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(title.replace("_", " ").split()).lower()
+
+
+def composition_key(composition: str) -> int:
+    """64-bit key of a composition string; medicines with the same composition share their links"""
+    digest = hashlib.blake2b(normalize_title(composition).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def strip_salt(ingredient: str) -> str:
+    words = [word for word in ingredient.split() if word not in _SALT_WORDS]
+    return " ".join(words)
+
+
+class TitleIndex:
+    """Normalized article titles, redirects and qualifier-free titles ("Aspirin (medication)") to article ids"""
+
+    def __init__(self, summaries: Iterable[Dict], redirects: Dict[str, int]):
+        self.titles: Dict[str, int] = {}
+        self.qualified: Dict[str, int] = {}
+        for summary in summaries:
+            title = normalize_title(summary["title"])
+            self.titles.setdefault(title, summary["id"])
+            base = _QUALIFIER_PATTERN.sub("", title)
+            if base != title:
+                self.qualified.setdefault(base, summary["id"])
+        known = set(self.titles.values())
+        # Only redirects to articles that have a summary are worth following
+        self.redirects = {normalize_title(title): target for title, target in redirects.items() if target in known}
+
+    def match(self, name: str) -> Optional[Tuple[int, int]]:
+        """(article id, score) for the best match of an ingredient name, or None"""
+        if name in self.titles:
+            return self.titles[name], SCORE_TITLE
+        if name in self.redirects:
+            return self.redirects[name], SCORE_REDIRECT
+        if name in self.qualified:
+            return self.qualified[name], SCORE_QUALIFIED_TITLE
+        return None
+
+    def link(self, composition: str) -> List[Tuple[int, int, int]]:
+        """Best articles for a composition as (article id, score, ingredient position), deduplicated"""
+        best: Dict[int, Tuple[int, int]] = {}
+        for position, ingredient in enumerate(parse_ingredients(composition)):
+            match = self.match(ingredient)
+            if match is None:
+                stripped = strip_salt(ingredient)
+                if stripped and stripped != ingredient:
+                    match = self.match(stripped)
+                    if match is not None:
+                        match = (match[0], match[1] - 1)
+            if match is None:
+                continue
+            article_id, score = match
+            if article_id not in best or score > best[article_id][0]:
+                best[article_id] = (score, position)
+        ranked = sorted(best.items(), key=lambda item: (-item[1][0], item[1][1]))
+        return [(article_id, score, position) for article_id, (score, position) in ranked[:MAX_REFERENCES]]
+
+
+def _fingerprint(directory: Path, dataset_version: str) -> str:
+    parts = [f"v{LINKS_FORMAT_VERSION}", dataset_version]
+    for name in (SUMMARIES_FILE, REDIRECTS_FILE):
+        path = directory / name
+        if path.exists():
+            stat = path.stat()
+            parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+def _load_summaries(directory: Path) -> List[Dict]:
+    with open(directory / SUMMARIES_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _load_redirects(directory: Path) -> Dict[str, int]:
+    try:
+        with open(directory / REDIRECTS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def build_links(compositions: Iterable[str], summaries: List[Dict], redirects: Dict[str, int]) -> Dict[str, np.ndarray]:
+    """Link every distinct composition to Wikipedia articles, as CSR arrays sorted by composition key"""
+    index = TitleIndex(summaries, redirects)
+    links: Dict[int, List[Tuple[int, int, int]]] = {}
+    for composition in compositions:
+        if composition:
+            key = composition_key(composition)
+            if key not in links:
+                links[key] = index.link(composition)
+
+    keys = np.array(sorted(key for key, found in links.items() if found), dtype=np.uint64)
+    offsets = np.zeros(len(keys) + 1, dtype=np.uint32)
+    article_ids, scores, positions = [], [], []
+    for i, key in enumerate(keys.tolist()):
+        for article_id, score, position in links[key]:
+            article_ids.append(article_id)
+            scores.append(score)
+            positions.append(position)
+        offsets[i + 1] = len(article_ids)
+    return {
+        "keys": keys,
+        "offsets": offsets,
+        "article_ids": np.array(article_ids, dtype=np.uint32),
+        "scores": np.array(scores, dtype=np.uint8),
+        "positions": np.array(positions, dtype=np.uint8),
+    }
+
+
+class _Links(NamedTuple):
+    """One loaded mapping; replaced as a whole so a request never mixes two versions"""
+    version: str
+    # When the links were built, for Last-Modified on responses that embed them
+    modified: float
+    arrays: Optional[Dict[str, np.ndarray]]
+    slots: Dict[int, int]
+    summaries: Dict[int, Tuple[str, str, str]]
+
+
+_NO_LINKS = _Links(version="", modified=0.0, arrays=None, slots={}, summaries={})
+
+
+class WikiLinker:
+    """Wikipedia summaries for a medicine's ingredients, from a precomputed composition -> article mapping
+
+    The mapping is built offline (or once in the background at startup) by
+    matching every distinct composition's ingredients against summarized article
+    titles and ZIM redirects, and saved to medicine_links.npz. At request time a
+    medicine's references are one dict lookup on its composition key. A reload
+    builds the new mapping aside and swaps it in with one assignment.
+    """
+
+    def __init__(self, directory: Path = WIKIPEDIA_DATA_DIR):
+        self.directory = Path(directory)
+        self._links = _NO_LINKS
+
+    @property
+    def version(self) -> str:
+        return self._links.version
+
+    @property
+    def modified(self) -> float:
+        return self._links.modified
+
+    def available(self) -> bool:
+        """Whether Wikipedia summaries have been processed; without them there is nothing to link"""
+        return (self.directory / SUMMARIES_FILE).exists()
+
+    def build(self, medicines=None) -> Path:
+        """Link the loaded catalogue and save the mapping, replacing any previous one atomically"""
+        medicines = medicines if medicines is not None else data_loader.medicines
+        summaries = _load_summaries(self.directory)
+        arrays = build_links((record.generic_name for record in medicines), summaries, _load_redirects(self.directory))
+        version = _fingerprint(self.directory, data_loader.dataset_version)
+        path = self.directory / LINKS_FILE
+        tmp = str(path) + f".{os.getpid()}.tmp.npz"
+        np.savez(tmp, version=np.array(version), **arrays)
+        os.replace(tmp, path)
+        logger.info(f"Linked {len(arrays['keys'])} compositions to {len(set(arrays['article_ids'].tolist()))} "
+                    f"Wikipedia articles -> {path}")
+        return path
+
+    def load(self):
+        """Load the saved mapping, rebuilding it first if the data or the summaries changed"""
+        if not self.available():
+            raise FileNotFoundError(f"No Wikipedia summaries in {self.directory}; run /process-wikipedia first")
+        expected = _fingerprint(self.directory, data_loader.dataset_version)
+        path = self.directory / LINKS_FILE
+        stored = None
+        if path.exists():
+            with np.load(path) as saved:
+                stored = str(saved["version"])
+        if stored != expected:
+            self.build()
+
+        with np.load(path) as saved:
+            arrays = {name: saved[name] for name in saved.files if name != "version"}
+        linked = set(arrays["article_ids"].tolist())
+        self._links = _Links(
+            version=expected,
+            modified=path.stat().st_mtime,
+            arrays=arrays,
+            slots={key: slot for slot, key in enumerate(arrays["keys"].tolist())},
+            # Keep only the summaries some medicine links to
+            summaries={summary["id"]: (summary["title"], summary["url"], summary["summary"])
+                       for summary in _load_summaries(self.directory) if summary["id"] in linked},
+        )
+
+    def references(self, composition: Optional[str]) -> List[WikipediaReference]:
+        links = self._links
+        if links.arrays is None or not composition:
+            return []
+        slot = links.slots.get(composition_key(composition))
+        if slot is None:
+            return []
+        arrays = links.arrays
+        start, end = int(arrays["offsets"][slot]), int(arrays["offsets"][slot + 1])
+        ingredients = parse_ingredients(composition)
+        references = []
+        for i in range(start, end):
+            article_id = int(arrays["article_ids"][i])
+            title, url, summary = links.summaries[article_id]
+            position = int(arrays["positions"][i])
+            references.append(WikipediaReference(
+                article_id=article_id,
+                title=title,
+                url=url,
+                summary=summary,
+                ingredient=ingredients[position] if position < len(ingredients) else "",
+                score=int(arrays["scores"][i])
+            ))
+        return references
+
+
+# Global linker instance
+wiki_linker = WikiLinker()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Link medicines to Wikipedia article summaries")
+    parser.add_argument("--data-dir", type=Path, default=WIKIPEDIA_DATA_DIR)
+    args = parser.parse_args()
+    data_loader.load_data()
+    WikiLinker(args.data_dir).build()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import logging
+import lzma
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from app.config import ZIM_ARTICLE_CACHE_MB, ZIM_CLUSTER_CACHE_MB, ZIM_FILE
+from app.models.drug_model import WikipediaArticle
+from app.utils.zim_processor import MedicalZIMProcessor, import_zimfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Namespaces holding articles: "A" in older ZIMs, "C" in those using the newer namespace scheme
+ARTICLE_NAMESPACES = ("A", "C")
+MAX_REDIRECTS = 5
+
+# Low nibble of a cluster's info byte; 0x10 marks an extended cluster with 8-byte blob offsets
+_COMPRESSION_NONE = (0, 1)
+_COMPRESSION_XZ = 4
+_COMPRESSION_ZSTD = 5
+_EXTENDED_CLUSTER = 0x10
+
+
+class _SizedLRU:
+    """LRU of values with a known size in bytes, evicting the least recently used past max_bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key: Hashable, value: Any, size: int):
+        if size > self.max_bytes or key in self._items:
+            return
+        self._items[key] = (value, size)
+        self._size += size
+        while self._size > self.max_bytes:
+            _, (_, evicted_size) = self._items.popitem(last=False)
+            self._size -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self._items.clear()
+        self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._items),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class ZIMArticleService:
+    """Wikipedia articles read straight from the ZIM file, without extracting it first
+
+    A title or URL is found by binary search over the ZIM's own title and URL
+    pointer lists, redirects are followed, and the article's HTML is cleaned the
+    same way process_articles cleans it. Articles are stored many to a
+    compressed cluster, so decompressed clusters are kept in a byte-bounded LRU
+    and neighbouring articles reuse them; cleaned articles have an LRU of their
+    own. The file is reopened, and the caches dropped, when it changes on disk,
+    so a newly copied ZIM is served on the next request.
+    """
+
+    def __init__(self, zim_path: Path = ZIM_FILE, cluster_cache_mb: int = ZIM_CLUSTER_CACHE_MB,
+                 article_cache_mb: int = ZIM_ARTICLE_CACHE_MB):
+        self.zim_path = Path(zim_path)
+        self.zim = None
+        self._signature: Optional[Tuple[int, int]] = None
+        # One file handle, read with seek(); every read happens under this lock
+        self._lock = threading.Lock()
+        self.clusters = _SizedLRU(cluster_cache_mb * 1024 * 1024)
+        self.articles = _SizedLRU(article_cache_mb * 1024 * 1024)
+        self._clean_html = MedicalZIMProcessor(str(self.zim_path)).clean_html
+
+    def _ensure_open(self):
+        try:
+            stat = self.zim_path.stat()
+        except FileNotFoundError:
+            self.close()
+            raise FileNotFoundError(f"ZIM file {self.zim_path} not found")
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if self.zim is not None and signature == self._signature:
+            return
+        self.close()
+        self.zim = import_zimfile()(str(self.zim_path), encoding="utf-8")
+        self._signature = signature
+        logger.info(f"Serving {len(self.zim):,} ZIM entries from {self.zim_path}")
+
+    def close(self):
+        if self.zim is not None:
+            self.zim.close()
+        self.zim = None
+        self._signature = None
+        self.clusters.clear()
+        self.articles.clear()
+
+    def _search(self, namespace: str, name: str, by_title: bool) -> Optional[int]:
+        """URL index of the entry named `name` in a namespace, by binary search over the sorted pointer list"""
+        target = (namespace, name)
+        front, end = 0, len(self.zim) - 1
+        while front <= end:
+            middle = (front + end) // 2
+            index = self.zim._read_title_offset(middle) if by_title else middle
+            entry = self.zim.read_directory_entry_by_index(index)
+            # An entry with no title is listed under its URL
+            key = (entry["namespace"], (entry["title"] or entry["url"]) if by_title else entry["url"])
+            if key == target:
+                return index
+            if key < target:
+                front = middle + 1
+            else:
+                end = middle - 1
+        return None
+
+    def _find(self, title: str) -> Optional[int]:
+        title = title.strip()
+        spaced = " ".join(title.replace("_", " ").split())
+        candidates = dict.fromkeys([title, spaced, spaced[:1].upper() + spaced[1:]])
+        for namespace in ARTICLE_NAMESPACES:
+            for candidate in candidates:
+                index = self._search(namespace, candidate, by_title=True)
+                if index is None:
+                    index = self._search(namespace, candidate.replace(" ", "_"), by_title=False)
+                if index is not None:
+                    return index
+        return None
+
+    def _read_cluster(self, cluster_index: int) -> bytes:
+        """Compressed bytes of one cluster, read under the lock"""
+        header = self.zim.header_fields
+        start = self.zim._read_cluster_offset(cluster_index)
+        # Clusters are stored back to back; the last one ends at the checksum
+        if cluster_index + 1 < header["clusterCount"]:
+            end = self.zim._read_cluster_offset(cluster_index + 1)
+        else:
+            end = header["checksumPos"]
+        self.zim.file.seek(start)
+        return self.zim.file.read(end - start if end > start else -1)
+
+    @staticmethod
+    def _decompress_cluster(raw: bytes) -> Tuple[bytes, np.ndarray]:
+        """Decompressed cluster data and its blob offsets; needs no lock"""
+        compression = raw[0] & 0x0F
+        if compression in _COMPRESSION_NONE:
+            data = raw[1:]
+        elif compression == _COMPRESSION_XZ:
+            data = lzma.LZMADecompressor().decompress(raw[1:])
+        elif compression == _COMPRESSION_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("This ZIM is zstd-compressed; install the zstandard package to read it")
+            data = zstandard.ZstdDecompressor().decompressobj().decompress(raw[1:])
+        else:
+            raise ValueError(f"Unsupported ZIM cluster compression {compression}")
+        dtype = np.dtype("<u8") if raw[0] & _EXTENDED_CLUSTER else np.dtype("<u4")
+        # The first offset is also the size of the offset table
+        count = int(np.frombuffer(data, dtype=dtype, count=1)[0]) // dtype.itemsize
+        offsets = np.frombuffer(data, dtype=dtype, count=count)
+        return data, offsets
+
+    def _build_article(self, index: int, entry: Dict[str, Any],
+                       cluster: Tuple[bytes, np.ndarray]) -> WikipediaArticle:
+        data, offsets = cluster
+        blob = entry["blobNumber"]
+        if blob + 1 >= len(offsets):
+            raise ValueError(f"Blob {blob} is out of range for cluster {entry['clusterNumber']}")
+        content = self._clean_html(data[int(offsets[blob]):int(offsets[blob + 1])].decode("utf-8", errors="ignore"))
+        return WikipediaArticle(article_id=index, title=entry["title"] or entry["url"], url=entry["url"],
+                                content=content, length=len(content))
+
+    def get(self, title: Optional[str] = None, article_id: Optional[int] = None) -> Optional[WikipediaArticle]:
+        """Cleaned article by title (or URL), or by article id as used by the extracted stores; None if absent
+
+        Raises FileNotFoundError when there is no ZIM file. Lookups and file reads
+        happen under the lock; decompression and cleaning run after releasing it,
+        so one slow cluster does not hold up every other request.
+        """
+        cluster = raw = None
+        with self._lock:
+            self._ensure_open()
+            index = self._find(title) if title is not None else article_id
+            if index is None or not 0 <= index < len(self.zim):
+                return None
+            redirected_from = None
+            for _ in range(MAX_REDIRECTS + 1):
+                entry = self.zim.read_directory_entry_by_index(index)
+                if "redirectIndex" not in entry:
+                    break
+                redirected_from = redirected_from or entry["title"] or entry["url"]
+                index = entry["redirectIndex"]
+            else:
+                return None
+            if entry["namespace"] not in ARTICLE_NAMESPACES:
+                return None
+            article = self.articles.get(index)
+            if article is None:
+                # Link targets (0xFFFE) and deleted entries (0xFFFD) have no mimetype in the list, nor any content
+                mimetype = entry["mimetype"]
+                if mimetype >= len(self.zim.mimetype_list) or self.zim.mimetype_list[mimetype] != "text/html":
+                    return None
+                signature = self._signature
+                cluster = self.clusters.get(entry["clusterNumber"])
+                if cluster is None:
+                    raw = self._read_cluster(entry["clusterNumber"])
+
+        if article is None:
+            if cluster is None:
+                cluster = self._decompress_cluster(raw)
+            article = self._build_article(index, entry, cluster)
+            with self._lock:
+                # Skip caching if the file was replaced while we worked
+                if self._signature == signature:
+                    self.clusters.put(entry["clusterNumber"], cluster, len(cluster[0]))
+                    self.articles.put(index, article, len(article.content))
+        if redirected_from is not None:
+            article = article.model_copy(update={"redirected_from": redirected_from})
+        return article
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters, read without the lock so health checks never wait on an article read"""
+        zim = self.zim
+        return {
+            "zim_path": str(self.zim_path),
+            "open": zim is not None,
+            "entries": len(zim) if zim is not None else 0,
+            "cluster_cache": self.clusters.stats(),
+            "article_cache": self.articles.stats(),
+        }
+
+
+# Global service instance
+zim_article_service = ZIMArticleService()
@@ -0,0 +1,238 @@
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARTICLE_STORE_FORMAT_VERSION = 1
+
+# Articles are packed into blocks of about this much UTF-8 text before compression; bigger
+# blocks compress better, smaller ones make a single-article read decompress less
+DEFAULT_BLOCK_BYTES = 256 * 1024
+
+# One row per compressed block; medical and non-medical articles never share a block
+BLOCK_INDEX_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("compressed_length", "<u4"),
+    ("length", "<u4"),
+    ("is_medical", "u1"),
+])
+
+# One row per article; offset and length address its UTF-8 text inside the decompressed block
+ARTICLE_META_DTYPE = np.dtype([
+    ("article_id", "<u4"),
+    ("block", "<u4"),
+    ("offset", "<u4"),
+    ("length", "<u4"),
+    ("text_length", "<u4"),
+    ("is_medical", "u1"),
+])
+
+BLOB_SUFFIX = ".blocks"
+BLOCK_INDEX_SUFFIX = ".blocks.npy"
+META_SUFFIX = ".meta.npy"
+TITLES_SUFFIX = ".titles.json"
+
+
+def _paths(directory: Path, name: str) -> Tuple[Path, Path, Path, Path]:
+    directory = Path(directory)
+    return (directory / f"{name}{BLOB_SUFFIX}", directory / f"{name}{BLOCK_INDEX_SUFFIX}",
+            directory / f"{name}{TITLES_SUFFIX}", directory / f"{name}{META_SUFFIX}")
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=9).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This article store is zstd-compressed; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class ArticleStoreWriter:
+    """Streams articles into compressed blocks, keeping medical and other articles in separate blocks
+
+    Articles are written as they arrive, so a whole ZIM never has to be held in
+    memory. The block index, titles and article metadata are written on close.
+    """
+
+    def __init__(self, directory: Path, name: str = "articles", block_bytes: int = DEFAULT_BLOCK_BYTES,
+                 codec: Optional[str] = None):
+        self.blob_path, self.blocks_path, self.titles_path, self.meta_path = _paths(directory, name)
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.codec = codec or ("zstd" if zstandard is not None else "gzip")
+        self.block_bytes = block_bytes
+        self._blob = open(str(self.blob_path) + ".tmp", "wb")
+        self._offset = 0
+        self._blocks: List[Tuple[int, int, int, int]] = []
+        # Open block per kind: (encoded texts, their byte size, rows of the articles in it)
+        self._pending = {True: ([], 0, []), False: ([], 0, [])}
+        self._meta: List[List[int]] = []
+        self._titles: List[Tuple[str, str]] = []
+
+    def add(self, article_id: int, title: str, url: str, content: str, is_medical: bool):
+        is_medical = bool(is_medical)
+        data = content.encode("utf-8")
+        texts, size, rows = self._pending[is_medical]
+        # Block number is filled in when the block is flushed
+        rows.append(len(self._meta))
+        self._meta.append([article_id, 0, size, len(data), len(content), int(is_medical)])
+        self._titles.append((title, url))
+        texts.append(data)
+        size += len(data)
+        self._pending[is_medical] = (texts, size, rows)
+        if size >= self.block_bytes:
+            self._flush(is_medical)
+
+    def _flush(self, is_medical: bool):
+        texts, size, rows = self._pending[is_medical]
+        if not texts:
+            return
+        block = len(self._blocks)
+        compressed = _compress(self.codec, b"".join(texts))
+        self._blob.write(compressed)
+        self._blocks.append((self._offset, len(compressed), size, int(is_medical)))
+        self._offset += len(compressed)
+        for row in rows:
+            self._meta[row][1] = block
+        self._pending[is_medical] = ([], 0, [])
+
+    def close(self):
+        """Flush the open blocks and publish every file, each replaced atomically"""
+        self._flush(True)
+        self._flush(False)
+        self._blob.close()
+        blocks_tmp = str(self.blocks_path) + ".tmp"
+        with open(blocks_tmp, "wb") as f:
+            np.save(f, np.array(self._blocks, dtype=BLOCK_INDEX_DTYPE))
+        titles_tmp = str(self.titles_path) + ".tmp"
+        with open(titles_tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "format_version": ARTICLE_STORE_FORMAT_VERSION,
+                "codec": self.codec,
+                "titles": [title for title, _ in self._titles],
+                "urls": [url for _, url in self._titles],
+            }, f, ensure_ascii=False)
+        meta_tmp = str(self.meta_path) + ".tmp"
+        with open(meta_tmp, "wb") as f:
+            np.save(f, np.array([tuple(row) for row in self._meta], dtype=ARTICLE_META_DTYPE))
+        os.replace(str(self.blob_path) + ".tmp", self.blob_path)
+        os.replace(blocks_tmp, self.blocks_path)
+        os.replace(titles_tmp, self.titles_path)
+        # The metadata goes last: readers treat it as the marker of a complete store
+        os.replace(meta_tmp, self.meta_path)
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def __enter__(self) -> "ArticleStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._blob.close()
+            os.unlink(str(self.blob_path) + ".tmp")
+
+
+class ArticleStore:
+    """Read-only article store replacing all_articles.json and medical_articles.json
+
+    Metadata (IDs, lengths, is_medical) is a small numpy table, so counting and
+    filtering articles decompresses nothing. iter_articles(medical=True) reads
+    and decompresses only the medical blocks, each once.
+    """
+
+    def __init__(self, directory: Path, name: str = "articles"):
+        self.blob_path, self.blocks_path, self.titles_path, self.meta_path = _paths(directory, name)
+        self.meta = np.load(self.meta_path)
+        self.blocks = np.load(self.blocks_path)
+        with open(self.titles_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        self.codec = header["codec"]
+        self.titles: List[str] = header["titles"]
+        self.urls: List[str] = header["urls"]
+        self._rows_by_id: Optional[Dict[int, int]] = None
+        # Last block decompressed by get(), so neighbouring lookups reuse it
+        self._cached_block: Tuple[int, bytes] = (-1, b"")
+
+    @staticmethod
+    def exists(directory: Path, name: str = "articles") -> bool:
+        return _paths(directory, name)[3].exists()
+
+    def __len__(self) -> int:
+        return len(self.meta)
+
+    def count(self, medical: Optional[bool] = None) -> int:
+        if medical is None:
+            return len(self.meta)
+        return int(np.count_nonzero(self.meta["is_medical"] == int(medical)))
+
+    def _read_block(self, block: int, f=None) -> bytes:
+        offset, compressed_length = int(self.blocks[block]["offset"]), int(self.blocks[block]["compressed_length"])
+        if f is None:
+            with open(self.blob_path, "rb") as blob:
+                blob.seek(offset)
+                data = blob.read(compressed_length)
+        else:
+            f.seek(offset)
+            data = f.read(compressed_length)
+        return _decompress(self.codec, data)
+
+    def _article(self, row: int, block_data: bytes, with_content: bool = True) -> Dict:
+        meta = self.meta[row]
+        article = {
+            "id": int(meta["article_id"]),
+            "title": self.titles[row],
+            "url": self.urls[row],
+            "length": int(meta["text_length"]),
+            "is_medical": bool(meta["is_medical"]),
+        }
+        if with_content:
+            offset = int(meta["offset"])
+            article["content"] = block_data[offset:offset + int(meta["length"])].decode("utf-8")
+        return article
+
+    def get(self, article_id: int) -> Optional[Dict]:
+        """One article in the shape the JSON files held, or None"""
+        if self._rows_by_id is None:
+            self._rows_by_id = {int(article_id): row for row, article_id in enumerate(self.meta["article_id"])}
+        row = self._rows_by_id.get(int(article_id))
+        if row is None:
+            return None
+        block = int(self.meta[row]["block"])
+        if self._cached_block[0] != block:
+            self._cached_block = (block, self._read_block(block))
+        return self._article(row, self._cached_block[1])
+
+    def iter_metadata(self, medical: Optional[bool] = None) -> Iterator[Dict]:
+        """Articles without their text, in the order they were added"""
+        for row in range(len(self.meta)):
+            if medical is None or bool(self.meta[row]["is_medical"]) == medical:
+                yield self._article(row, b"", with_content=False)
+
+    def iter_articles(self, medical: Optional[bool] = None) -> Iterator[Dict]:
+        """Articles with their text, block by block; medical=True never touches non-medical blocks"""
+        order = np.argsort(self.meta["block"], kind="stable")
+        block_of_row = self.meta["block"][order]
+        with open(self.blob_path, "rb") as f:
+            for block in range(len(self.blocks)):
+                if medical is not None and bool(self.blocks[block]["is_medical"]) != medical:
+                    continue
+                data = self._read_block(block, f)
+                start, end = np.searchsorted(block_of_row, [block, block + 1])
+                for row in order[start:end]:
+                    yield self._article(int(row), data)
@@ -0,0 +1,152 @@
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# One fixed-width row per chunk; offset and length address the chunk's UTF-8 bytes in the blob
+CHUNK_INDEX_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("length", "<u4"),
+    ("article_id", "<u4"),
+    ("chunk_index", "<u4"),
+])
+
+BLOB_SUFFIX = ".bin"
+INDEX_SUFFIX = ".idx.npy"
+ARTICLES_SUFFIX = ".articles.json"
+
+
+def _paths(directory: Path, name: str) -> Tuple[Path, Path, Path]:
+    directory = Path(directory)
+    return (directory / f"{name}{BLOB_SUFFIX}", directory / f"{name}{INDEX_SUFFIX}",
+            directory / f"{name}{ARTICLES_SUFFIX}")
+
+
+class ChunkStoreWriter:
+    """Streams chunk text into a blob file and writes the offset table and article titles on close"""
+
+    def __init__(self, directory: Path, name: str = "medical_chunks"):
+        self.blob_path, self.index_path, self.articles_path = _paths(directory, name)
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self._blob = open(str(self.blob_path) + ".tmp", "wb")
+        self._rows: List[Tuple[int, int, int, int]] = []
+        self._articles: Dict[int, Tuple[str, str]] = {}
+        self._offset = 0
+
+    def add_article(self, article_id: int, title: str, url: str):
+        self._articles[article_id] = (title, url)
+
+    def add(self, article_id: int, chunk_index: int, text: str):
+        data = text.encode("utf-8")
+        self._blob.write(data)
+        self._rows.append((self._offset, len(data), article_id, chunk_index))
+        self._offset += len(data)
+
+    def close(self):
+        """Finish the blob and publish all three files, each replaced atomically"""
+        self._blob.close()
+        index = np.array(self._rows, dtype=CHUNK_INDEX_DTYPE)
+        index_tmp = str(self.index_path) + ".tmp"
+        with open(index_tmp, "wb") as f:
+            np.save(f, index)
+        articles_tmp = str(self.articles_path) + ".tmp"
+        with open(articles_tmp, "w", encoding="utf-8") as f:
+            json.dump({str(article_id): list(info) for article_id, info in self._articles.items()},
+                      f, ensure_ascii=False)
+        os.replace(str(self.blob_path) + ".tmp", self.blob_path)
+        os.replace(articles_tmp, self.articles_path)
+        # The index goes last: readers treat it as the marker of a complete store
+        os.replace(index_tmp, self.index_path)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __enter__(self) -> "ChunkStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._blob.close()
+            os.unlink(str(self.blob_path) + ".tmp")
+
+
+class ChunkStore:
+    """Read-only chunk store: the blob and offset table are memory-mapped, so opening it reads
+    no chunk text and each lookup decodes only the bytes of the chunk asked for"""
+
+    def __init__(self, directory: Path, name: str = "medical_chunks", source: str = "wikipedia_medical_mini"):
+        self.blob_path, self.index_path, self.articles_path = _paths(directory, name)
+        self.source = source
+        try:
+            self.index = np.load(self.index_path, mmap_mode="r")
+        except ValueError:
+            # Zero-length arrays cannot be memory-mapped
+            self.index = np.load(self.index_path)
+        self._file = open(self.blob_path, "rb")
+        # mmap cannot map an empty file
+        self._blob = (mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                      if os.fstat(self._file.fileno()).st_size else b"")
+        self._articles: Optional[Dict[str, List[str]]] = None
+
+    @staticmethod
+    def exists(directory: Path, name: str = "medical_chunks") -> bool:
+        return _paths(directory, name)[1].exists()
+
+    @staticmethod
+    def count(directory: Path, name: str = "medical_chunks") -> int:
+        """Number of chunks in a store, read from the index header without mapping anything"""
+        with open(_paths(directory, name)[1], "rb") as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, _, _ = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, _, _ = np.lib.format.read_array_header_2_0(f)
+        return shape[0]
+
+    def text(self, position: int) -> str:
+        row = self.index[position]
+        offset = int(row["offset"])
+        return self._blob[offset:offset + int(row["length"])].decode("utf-8")
+
+    def _article(self, article_id: int) -> List[str]:
+        if self._articles is None:
+            with open(self.articles_path, "r", encoding="utf-8") as f:
+                self._articles = json.load(f)
+        return self._articles.get(str(article_id), ["", ""])
+
+    def chunk(self, position: int) -> Dict:
+        """One chunk in the shape medical_chunks.json used to hold"""
+        row = self.index[position]
+        article_id = int(row["article_id"])
+        chunk_index = int(row["chunk_index"])
+        content = self.text(position)
+        title, url = self._article(article_id)
+        return {
+            "id": f"{article_id}_chunk{chunk_index}",
+            "article_title": title,
+            "article_url": url,
+            "chunk_index": chunk_index,
+            "content": content,
+            "length": len(content),
+            "source": self.source,
+        }
+
+    def positions_for_article(self, article_id: int) -> np.ndarray:
+        return np.flatnonzero(self.index["article_id"] == article_id)
+
+    def close(self):
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for position in range(len(self)):
+            yield self.chunk(position)
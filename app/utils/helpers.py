@@ -0,0 +1,29 @@
+import os
+from typing import Optional
+
+
+def get_rss_bytes() -> Optional[int]:
+    """Return the resident set size of the current process in bytes, if it can be measured"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def format_bytes(size: Optional[int]) -> str:
+    """Format a byte count for log messages"""
+    if size is None:
+        return "n/a"
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
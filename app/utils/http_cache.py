@@ -0,0 +1,191 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as-is; compressing them saves little and costs a round of CPU
+MIN_COMPRESS_BYTES = 1024
+# Upper bound on the encoded bodies kept in memory across all responses
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+
+
+def _compress(body: bytes) -> Dict[str, bytes]:
+    """Every encoding of body worth sending, keyed by Content-Encoding ("identity" for none)"""
+    encodings = {"identity": body}
+    if len(body) >= MIN_COMPRESS_BYTES:
+        encodings["gzip"] = gzip.compress(body, compresslevel=6, mtime=0)
+        if brotli is not None:
+            encodings["br"] = brotli.compress(body, quality=5)
+    return encodings
+
+
+def _serialize(content: Any) -> bytes:
+    """Same serialization as FastAPI's JSONResponse"""
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def _accepted_encodings(request: Request) -> set:
+    accepted = set()
+    for item in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.replace(" ", "").lower() in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _opaque_tag(value: str) -> str:
+    """Entity tag without W/ prefix, quotes or encoding suffix, for weak comparison"""
+    value = value.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    return value.strip('"').split("+", 1)[0]
+
+
+class ResponseCache:
+    """Conditional GET support and pre-encoded JSON bodies for responses that only change with the data
+
+    Every response is identified by the dataset version and its request path and
+    query, so the ETag is known before the body is built and a matching
+    If-None-Match answers 304 without touching the data. Bodies are serialized
+    and compressed once per dataset version and kept in a bounded LRU.
+    """
+
+    def __init__(self, version_source: Callable[[], Tuple[str, float]],
+                 max_bytes: int = DEFAULT_CACHE_BYTES):
+        # Returns (dataset version, Unix time the data last changed)
+        self.version_source = version_source
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bodies: "OrderedDict[str, Dict[str, bytes]]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _cache_key(self, request: Request, version: str) -> str:
+        query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+        identity = f"{version}\n{request.url.path}\n{query}"
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:20]
+
+    def _not_modified(self, request: Request, tag: str, modified: float) -> Optional[Tuple[str, bool]]:
+        """(ETag to send with a 304, whether the client sent this exact tag) if its copy is current, else None
+
+        Only an exact tag proves the resource exists, since tags are only sent with
+        200s; `*` and If-Modified-Since match any path, including one that is 404.
+        """
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+            for candidate in if_none_match.split(","):
+                candidate = candidate.strip()
+                if candidate == "*":
+                    return f'"{tag}"', False
+                if _opaque_tag(candidate) == tag:
+                    # Echo the client's own tag, which names the encoding it holds
+                    return (candidate[2:] if candidate.startswith("W/") else candidate), True
+            return None
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                if int(modified) <= parsedate_to_datetime(if_modified_since).timestamp():
+                    return f'"{tag}"', False
+            except (TypeError, ValueError):
+                pass
+        return None
+
+    def _get(self, key: str) -> Optional[Dict[str, bytes]]:
+        with self._lock:
+            encodings = self._bodies.get(key)
+            if encodings is not None:
+                self._bodies.move_to_end(key)
+            return encodings
+
+    def _put(self, key: str, encodings: Dict[str, bytes]):
+        size = sum(len(body) for body in encodings.values())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._bodies:
+                return
+            self._bodies[key] = encodings
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._bodies.popitem(last=False)
+                self._size -= sum(len(body) for body in evicted.values())
+
+    def _not_modified_response(self, headers: Dict[str, str], tag: str) -> Response:
+        self.not_modified += 1
+        headers["ETag"] = tag
+        return Response(status_code=304, headers=headers)
+
+    def respond(self, request: Request, produce: Callable[[], Any]) -> Response:
+        """Answer 304 if the client's copy is current, otherwise the cached or freshly built body
+
+        produce() is only called on a cache miss; HTTPExceptions it raises are not cached.
+        """
+        version, modified = self.version_source()
+        if not version:
+            # The data is still being fingerprinted: serve the body without validators or caching
+            return Response(content=_serialize(produce()), media_type="application/json")
+        key = self._cache_key(request, version)
+        tag = f"{version}.{key}"
+        headers = {
+            "Last-Modified": formatdate(modified, usegmt=True),
+            # Clients may keep the body but must revalidate, which is a cheap 304 while the data is unchanged
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+
+        match = self._not_modified(request, tag, modified)
+        if match is not None and match[1]:
+            return self._not_modified_response(headers, match[0])
+
+        encodings = self._get(key)
+        if encodings is None:
+            self.misses += 1
+            body = _serialize(produce())
+            if self.version_source()[0] != version:
+                # The data was swapped while the body was built, so it may not match this tag
+                return Response(content=body, media_type="application/json")
+            encodings = _compress(body)
+            self._put(key, encodings)
+        else:
+            self.hits += 1
+        if match is not None:
+            # A wildcard or date match, and the resource exists: produce() would have raised otherwise
+            return self._not_modified_response(headers, match[0])
+
+        accepted = _accepted_encodings(request)
+        encoding = next((coding for coding in ("br", "gzip") if coding in encodings and coding in accepted),
+                        "identity")
+        if encoding == "identity":
+            headers["ETag"] = f'"{tag}"'
+        else:
+            # Each representation gets its own strong tag; _opaque_tag strips the suffix again
+            headers["ETag"] = f'"{tag}+{encoding}"'
+            headers["Content-Encoding"] = encoding
+        return Response(content=encodings[encoding], media_type="application/json", headers=headers)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._bodies),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
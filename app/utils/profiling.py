@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from app.config import PROFILE_DIR, PROFILE_KEEP, PROFILE_SAMPLE_INTERVAL_MS, PROFILE_TOKEN
+
+logger = logging.getLogger(__name__)
+
+# ASGI header names arrive lower-cased as bytes
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# A thread whose innermost Python frame is in one of these files is parked (waiting on a lock,
+# a queue or a socket, or an idle concurrent.futures worker), not working
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "thread.py")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the Python stacks of running threads on a background thread
+
+    The request's own thread is always sampled (time it spends awaiting shows up
+    as the event loop's select), other threads only while they are not parked,
+    so work the request hands to thread pools, such as the LLM batch thread, is
+    included. Stacks are counted per thread in collapsed (flamegraph.pl) form.
+
+    The sampler needs the GIL to take a sample, so while any sampler runs the
+    interpreter's switch interval is lowered to the sampling interval; otherwise
+    a busy thread would hold the GIL for 5 ms at a time and short requests
+    would get no samples at all.
+    """
+
+    _active = 0
+    _active_lock = threading.Lock()
+    _saved_switch_interval = None
+
+    def __init__(self, interval: float, focus_thread: int):
+        self.interval = interval
+        self.focus_thread = focus_thread
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        with StackSampler._active_lock:
+            if StackSampler._active == 0:
+                StackSampler._saved_switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self.interval, StackSampler._saved_switch_interval))
+            StackSampler._active += 1
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        with StackSampler._active_lock:
+            StackSampler._active -= 1
+            if StackSampler._active == 0:
+                sys.setswitchinterval(StackSampler._saved_switch_interval)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id != self.focus_thread and os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """Decides which requests to profile and stores their collapsed stacks under PROFILE_DIR
+
+    A request is profiled when it carries `X-Profile: <PROFILE_TOKEN>`, or when
+    sampling has been switched on at runtime (configure(), behind the same
+    token) and it falls within sample_rate for one of the sampled paths.
+    """
+
+    def __init__(self, output_dir: Path = PROFILE_DIR, token: Optional[str] = PROFILE_TOKEN,
+                 interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS, keep: int = PROFILE_KEEP):
+        self.output_dir = Path(output_dir)
+        self.token = token
+        self.interval = interval_ms / 1000
+        self.keep = keep
+        self.sample_rate = 0.0
+        self.paths: List[str] = []
+        self._lock = threading.Lock()
+
+    def configure(self, sample_rate: float, paths: Sequence[str] = ()):
+        """Admin toggle: profile this fraction of requests to paths starting with any of `paths`"""
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.paths = list(paths)
+
+    def should_profile(self, path: str, header: Optional[str]) -> bool:
+        if header is not None and self.token and header == self.token:
+            return True
+        return (self.sample_rate > 0 and any(path.startswith(prefix) for prefix in self.paths)
+                and random.random() < self.sample_rate)
+
+    def profile_name(self, method: str, path: str) -> str:
+        slug = "".join(c if c.isalnum() else "_" for c in path.strip("/")) or "root"
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}_{method}_{slug[:60]}"
+
+    def save(self, name: str, sampler: StackSampler, elapsed: float) -> Path:
+        """Write one profile; elapsed milliseconds go in the file name so slow ones stand out"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"{name}_{elapsed * 1000:.0f}ms.collapsed"
+        path.write_text(sampler.collapsed(), encoding="utf-8")
+        with self._lock:
+            profiles = sorted(self.output_dir.glob("*.collapsed"), key=lambda p: p.stat().st_mtime)
+            for old in profiles[:-self.keep] if self.keep else []:
+                old.unlink(missing_ok=True)
+        logger.info(f"Profiled {name}: {sampler.samples} samples in {elapsed * 1000:.1f} ms -> {path}")
+        return path
+
+    def recent(self, limit: int = 20) -> List[Dict]:
+        if not self.output_dir.exists():
+            return []
+        profiles = sorted(self.output_dir.glob("*.collapsed"), key=lambda p: p.stat().st_mtime, reverse=True)
+        return [{"file": path.name, "bytes": path.stat().st_size} for path in profiles[:limit]]
+
+    def state(self) -> Dict:
+        return {
+            "header_enabled": bool(self.token),
+            "sample_rate": self.sample_rate,
+            "paths": self.paths,
+            "interval_ms": self.interval * 1000,
+            "output_dir": str(self.output_dir),
+        }
+
+
+class ProfilingMiddleware:
+    """Plain ASGI middleware, so requests that are not profiled pay one header lookup and nothing else"""
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.profiler.token or self.profiler.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        header = None
+        for key, value in scope["headers"]:
+            if key == PROFILE_HEADER:
+                header = value.decode("latin-1")
+                break
+        if not self.profiler.should_profile(scope["path"], header):
+            await self.app(scope, receive, send)
+            return
+
+        name = self.profiler.profile_name(scope["method"], scope["path"])
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(PROFILE_ID_HEADER, name.encode())]
+            await send(message)
+
+        sampler = StackSampler(self.profiler.interval, threading.get_ident())
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            elapsed = time.perf_counter() - started
+            # Joining the sampler thread and writing the profile block, so keep them off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self._finish, name, sampler, elapsed)
+
+    def _finish(self, name: str, sampler: "StackSampler", elapsed: float):
+        sampler.stop()
+        self.profiler.save(name, sampler, elapsed)
+
+
+# Global profiler used by the middleware and the admin endpoints
+request_profiler = RequestProfiler()
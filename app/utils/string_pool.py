@@ -0,0 +1,74 @@
+import sys
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+
+class StringPool:
+    """Append-only pool of unique strings addressed by integer id"""
+
+    def __init__(self):
+        self._strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        """Return the id of value, adding it to the pool if it is new"""
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(value)
+            self._ids[value] = string_id
+        return string_id
+
+    def intern_many(self, values: Iterable[str]) -> np.ndarray:
+        """Intern every value and return their ids as a uint32 array"""
+        return np.fromiter((self.intern(value) for value in values), dtype=np.uint32)
+
+    def seal(self):
+        """Drop the reverse lookup table once no more strings will be added"""
+        self._ids = {}
+
+    def __getitem__(self, string_id: int) -> str:
+        return self._strings[string_id]
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the pool in bytes"""
+        total = sys.getsizeof(self._strings) + sys.getsizeof(self._ids)
+        return total + sum(sys.getsizeof(value) for value in self._strings)
+
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode the pool as one UTF-8 blob plus an offsets array (len + 1 entries)"""
+        encoded = [value.encode("utf-8") for value in self._strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return blob, offsets
+
+
+class FrozenStringPool:
+    """Read-only string pool over a UTF-8 blob and offsets, e.g. memory-mapped from disk
+
+    Strings are decoded on access, so nothing is copied into the process until it is read.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+        self._view = memoryview(blob) if len(blob) else memoryview(b"")
+
+    def __getitem__(self, string_id: int) -> str:
+        start = int(self._offsets[string_id])
+        end = int(self._offsets[string_id + 1])
+        return str(self._view[start:end], "utf-8")
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self._blob, self._offsets
+
+    def nbytes(self) -> int:
+        return self._blob.nbytes + self._offsets.nbytes
@@ -1,14 +1,56 @@
-from zimply.zimply import ZIMFile
 import json
 import re
 import html
 from tqdm import tqdm
 import os
 from pathlib import Path
+from functools import lru_cache
+from typing import Callable, Optional
 import logging
 
+from app.config import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, MODEL_NAME
+from app.utils.article_store import ArticleStore, ArticleStoreWriter
+from app.utils.chunk_store import ChunkStoreWriter
+
 logger = logging.getLogger(__name__)
 
+
+def load_token_counter(model_name: str = MODEL_NAME) -> Callable[[str], int]:
+    """Count tokens the way the embedding model will, using whichever tokenizer is installed
+
+    Falls back to tiktoken's GPT encoding, then to a rough four-characters-per-token estimate.
+    """
+    try:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+    except Exception as e:
+        logger.info(f"Tokenizer for {model_name} unavailable ({e}), trying tiktoken")
+
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text))
+    except Exception:
+        logger.info("tiktoken unavailable, estimating tokens from characters")
+
+    return lambda text: max(1, (len(text) + 3) // 4)
+
+def import_zimfile():
+    """zimply's ZIMFile, imported without the gevent monkey-patching its module does for its own web server
+
+    The patching swaps out threading and sockets under uvicorn's event loop and
+    thread pools; only ZIMFile's file readers are used here, so it is skipped.
+    """
+    from gevent import monkey
+    patch_all = monkey.patch_all
+    monkey.patch_all = lambda *args, **kwargs: None
+    try:
+        from zimply.zimply import ZIMFile
+    finally:
+        monkey.patch_all = patch_all
+    return ZIMFile
+
 class MedicalZIMProcessor:
     def __init__(self, zim_path):
         self.zim_path = zim_path
@@ -51,8 +93,14 @@ class MedicalZIMProcessor:
         
         return title_medical or content_medical or pattern_medical
     
-    def chunk_text(self, text, chunk_size=400, overlap=50):
-        """Split text into overlapping chunks"""
+    def chunk_text(self, text, chunk_size=400, overlap=50, count_tokens: Optional[Callable[[str], int]] = None):
+        """Split text into overlapping chunks
+
+        chunk_size and overlap count words, or tokens when count_tokens is given.
+        """
+        if count_tokens is not None:
+            return self._chunk_tokens(text, chunk_size, overlap, count_tokens)
+
         words = text.split()
         if len(words) <= chunk_size:
             return [text]
@@ -65,6 +113,34 @@ class MedicalZIMProcessor:
                 break
         return chunks
 
+    def _chunk_tokens(self, text, max_tokens, overlap, count_tokens):
+        """Greedy word-boundary chunks of at most max_tokens tokens, overlapping by about overlap tokens"""
+        words = text.split()
+        lengths = [count_tokens(" " + word) for word in words]
+        if sum(lengths) <= max_tokens:
+            return [text] if words else []
+
+        chunks = []
+        start = 0
+        while start < len(words):
+            end = start
+            total = 0
+            # Always take at least one word, even one longer than max_tokens
+            while end < len(words) and (end == start or total + lengths[end] <= max_tokens):
+                total += lengths[end]
+                end += 1
+            chunks.append(' '.join(words[start:end]))
+            if end >= len(words):
+                break
+            # Step back over trailing words worth up to `overlap` tokens, but always move forward
+            next_start = end
+            carried = 0
+            while next_start - 1 > start and carried + lengths[next_start - 1] <= overlap:
+                next_start -= 1
+                carried += lengths[next_start]
+            start = next_start
+        return chunks
+
     def summarize_text(self, text, max_length=400):
         """Generate a summary of the text"""
         if len(text) <= max_length:
@@ -117,84 +193,82 @@ class MedicalZIMProcessor:
             return self.summarize_text(text)
     
     def process_articles(self, output_dir="app/data/medical_wikipedia_data"):
-        """Process all articles in the ZIM file"""
+        """Process all articles in the ZIM file
+
+        Articles are streamed into one compressed article store (articles.blocks
+        and friends, see app/utils/article_store.py) that flags medical articles,
+        then chunks and summaries are built from its medical blocks only.
+        """
         
         os.makedirs(output_dir, exist_ok=True)
-        all_articles = []
-        medical_articles = []
+        total_articles = 0
+        medical_count = 0
+        # Redirect title -> target article index, used to link medicine ingredients to articles
+        redirects = {}
         
         try:
             print(f"Opening ZIM file: {self.zim_path}")
             # Open ZIM file with explicit encoding
-            zim = ZIMFile(self.zim_path, encoding="utf-8")
+            zim = import_zimfile()(self.zim_path, encoding="utf-8")
             
             total_entries = len(zim)
             print(f"Total entries found: {total_entries:,}")
             
-            # Iterate through ZIM file entries using index-based access
-            for i in tqdm(range(total_entries), desc="Processing articles"):
-                try:
-                    # Get the directory entry by index
-                    dir_entry = zim.read_directory_entry_by_index(i)
+            with ArticleStoreWriter(output_dir, "articles") as writer:
+                # Iterate through ZIM file entries using index-based access
+                for i in tqdm(range(total_entries), desc="Processing articles"):
+                    try:
+                        # Get the directory entry by index
+                        dir_entry = zim.read_directory_entry_by_index(i)
                     
-                    # Check if it's an article entry (not a redirect)
-                    if 'redirectIndex' not in dir_entry:
-                        # Get the article content
-                        article = zim._get_article_by_index(i)
+                        # Check if it's an article entry (not a redirect)
+                        if 'redirectIndex' in dir_entry:
+                            if dir_entry.get('title'):
+                                redirects[dir_entry['title']] = dir_entry['redirectIndex']
+                        else:
+                            # Get the article content
+                            article = zim._get_article_by_index(i)
                         
-                        if article and article.mimetype == 'text/html':
-                            # Decode the article content
-                            try:
-                                html_content = article.data.decode('utf-8', errors='ignore')
-                            except Exception:
+                            if article and article.mimetype == 'text/html':
+                                # Decode the article content
                                 try:
-                                    html_content = article.data.decode('latin-1', errors='ignore')
+                                    html_content = article.data.decode('utf-8', errors='ignore')
                                 except Exception:
-                                    html_content = str(article.data)
+                                    try:
+                                        html_content = article.data.decode('latin-1', errors='ignore')
+                                    except Exception:
+                                        html_content = str(article.data)
                             
-                            plain_text = self.clean_html(html_content)
+                                plain_text = self.clean_html(html_content)
                             
-                            if len(plain_text) > 200:
-                                article_data = {
-                                    "id": i,  # Using index as ID
-                                    "title": dir_entry['title'],
-                                    "url": dir_entry['url'],
-                                    "content": plain_text,
-                                    "length": len(plain_text),
-                                    "is_medical": self.is_medical_article(
-                                        dir_entry['title'],
-                                        plain_text
-                                    )
-                                }
-                                
-                                all_articles.append(article_data)
-                                if article_data['is_medical']:
-                                    medical_articles.append(article_data)
+                                if len(plain_text) > 200:
+                                    is_medical = self.is_medical_article(dir_entry['title'], plain_text)
+                                    # Using index as ID
+                                    writer.add(i, dir_entry['title'], dir_entry['url'], plain_text, is_medical)
+                                    total_articles += 1
+                                    medical_count += is_medical
                                     
-                except Exception as e:
-                    print(f"Error processing entry {i}: {e}")
-                    continue
-            
-            # Save all files to data/ folder
-            all_output_path = os.path.join(output_dir, "all_articles.json")
-            with open(all_output_path, 'w', encoding='utf-8') as f:
-                json.dump(all_articles, f, indent=2, ensure_ascii=False)
+                    except Exception as e:
+                        print(f"Error processing entry {i}: {e}")
+                        continue
             
-            medical_output_path = os.path.join(output_dir, "medical_articles.json")
-            with open(medical_output_path, 'w', encoding='utf-8') as f:
-                json.dump(medical_articles, f, indent=2, ensure_ascii=False)
+            with open(os.path.join(output_dir, "redirects.json"), 'w', encoding='utf-8') as f:
+                json.dump(redirects, f, ensure_ascii=False)
             
-            self.create_summaries(medical_articles, output_dir)
+            # Chunks and summaries only decompress the medical blocks
+            store = ArticleStore(output_dir, "articles")
+            self.create_chunks(store.iter_articles(medical=True), output_dir, total=medical_count)
+            self.create_summaries(store.iter_articles(medical=True), output_dir, total=medical_count)
             
             print(f"\nProcessing complete!")
-            print(f"Total articles processed: {len(all_articles):,}")
-            print(f"Medical articles identified: {len(medical_articles):,}")
+            print(f"Total articles processed: {total_articles:,}")
+            print(f"Medical articles identified: {medical_count:,}")
             print(f"Files saved to: {output_dir}")
             
             return {
                 "status": "success",
-                "total_articles": len(all_articles),
-                "medical_articles": len(medical_articles),
+                "total_articles": total_articles,
+                "medical_articles": medical_count,
                 "output_dir": output_dir
             }
             
@@ -203,38 +277,35 @@ class MedicalZIMProcessor:
             print(error_msg)
             return {"status": "error", "message": error_msg}
     
-    def create_chunks(self, articles, output_dir, chunk_size=400):
-        """Create chunks for vector database"""
-        chunks = []
-        chunk_id = 0
-        
-        for article in tqdm(articles, desc="Creating chunks"):
-            article_chunks = self.chunk_text(article['content'], chunk_size)
-            
-            for chunk_index, chunk_content in enumerate(article_chunks):
-                chunk_data = {
-                    "id": f"{article['id']}_chunk{chunk_index}",
-                    "article_title": article['title'],
-                    "article_url": article['url'],
-                    "chunk_index": chunk_index,
-                    "content": chunk_content,
-                    "length": len(chunk_content),
-                    "source": "wikipedia_medical_mini"
-                }
-                chunks.append(chunk_data)
-                chunk_id += 1
-        
-        chunks_path = os.path.join(output_dir, "medical_chunks.json")
-        with open(chunks_path, 'w', encoding='utf-8') as f:
-            json.dump(chunks, f, indent=2, ensure_ascii=False)
+    def create_chunks(self, articles, output_dir, chunk_size=CHUNK_MAX_TOKENS, overlap=CHUNK_OVERLAP_TOKENS,
+                      count_tokens: Optional[Callable[[str], int]] = None, total: Optional[int] = None):
+        """Create chunks for vector database
+
+        Writes a binary chunk store (medical_chunks.bin/.idx.npy/.articles.json, see
+        app/utils/chunk_store.py) that readers memory-map instead of parsing JSON.
+        """
+        if count_tokens is None:
+            count_tokens = load_token_counter()
+        # Words repeat a lot across a corpus; tokenize each distinct one once
+        count_tokens = lru_cache(maxsize=65536)(count_tokens)
+
+        article_count = 0
+        with ChunkStoreWriter(output_dir, "medical_chunks") as writer:
+            for article in tqdm(articles, desc="Creating chunks", total=total):
+                article_count += 1
+                writer.add_article(article['id'], article['title'], article['url'])
+                article_chunks = self.chunk_text(article['content'], chunk_size, overlap, count_tokens)
+                for chunk_index, chunk_content in enumerate(article_chunks):
+                    writer.add(article['id'], chunk_index, chunk_content)
+            chunk_count = len(writer)
         
-        print(f"Created {len(chunks):,} chunks from {len(articles):,} medical articles")
+        print(f"Created {chunk_count:,} chunks from {article_count:,} medical articles")
 
-    def create_summaries(self, articles, output_dir):
+    def create_summaries(self, articles, output_dir, total: Optional[int] = None):
         """Create summaries for articles"""
         summaries = []
 
-        for article in tqdm(articles, desc="Creating summaries"):
+        for article in tqdm(articles, desc="Creating summaries", total=total):
             # Generate summary using LLM or fallback
             summary_text = self.generate_llm_summary(article['content'], article['title'])
 
@@ -253,7 +324,7 @@ class MedicalZIMProcessor:
         with open(summaries_path, 'w', encoding='utf-8') as f:
             json.dump(summaries, f, indent=2, ensure_ascii=False)
 
-        print(f"Created {len(summaries):,} summaries from {len(articles):,} medical articles")
+        print(f"Created {len(summaries):,} summaries of medical articles")
 
 # Standalone function to run the processor
 def process_medical_wikipedia():
@@ -7,6 +7,8 @@ import os
 import re
 import logging
 
+from app.utils.article_store import ArticleStore
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -40,23 +42,31 @@ def summarize_text(text, max_length=200):
 
 def create_summaries_from_articles():
     """Create summaries from existing medical articles"""
-    articles_file = "app/data/medical_wikipedia_data/medical_articles.json"
-    summaries_file = "app/data/medical_wikipedia_data/medical_summaries.json"
-
-    if not os.path.exists(articles_file):
-        print(f"Articles file not found: {articles_file}")
+    data_dir = "app/data/medical_wikipedia_data"
+    articles_file = os.path.join(data_dir, "medical_articles.json")
+    summaries_file = os.path.join(data_dir, "medical_summaries.json")
+
+    if ArticleStore.exists(data_dir):
+        # Only the medical blocks of the article store are read and decompressed
+        store = ArticleStore(data_dir)
+        total = store.count(medical=True)
+        articles = store.iter_articles(medical=True)
+    elif os.path.exists(articles_file):
+        # Output of older versions of the ZIM processor
+        print("Loading medical articles...")
+        with open(articles_file, 'r', encoding='utf-8') as f:
+            articles = json.load(f)
+        total = len(articles)
+    else:
+        print(f"No article store or articles file found in {data_dir}")
         return
 
-    print("Loading medical articles...")
-    with open(articles_file, 'r', encoding='utf-8') as f:
-        articles = json.load(f)
-
-    print(f"Found {len(articles)} articles. Creating summaries...")
+    print(f"Found {total} articles. Creating summaries...")
 
     summaries = []
     for i, article in enumerate(articles):
         if i % 100 == 0:
-            print(f"Processed {i}/{len(articles)} articles...")
+            print(f"Processed {i}/{total} articles...")
 
         # Generate summary
         summary_text = summarize_text(article['content'], max_length=200)
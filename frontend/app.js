@@ -113,6 +113,7 @@ function renderMedicinesPage() {
             <div id="medicinesList"></div>
         </div>
     `;
+    attachAutocomplete('searchInput');
 }
 
 function renderInteractionChecker() {
@@ -137,6 +138,7 @@ function renderInteractionChecker() {
             <div id="interactionResults"></div>
         </div>
     `;
+    attachAutocomplete('medicineInput');
 }
 
 function renderMediGuide() {
@@ -236,8 +238,46 @@ function renderMediGuide() {
     `;
 }
 
+// Autocomplete Functions
+const autocompleteCache = new Map();
+let autocompleteTimer = null;
+
+function attachAutocomplete(inputId) {
+    const input = document.getElementById(inputId);
+    const datalist = document.createElement('datalist');
+    datalist.id = `${inputId}Suggestions`;
+    input.setAttribute('list', datalist.id);
+    input.setAttribute('autocomplete', 'off');
+    input.after(datalist);
+
+    input.addEventListener('input', () => {
+        clearTimeout(autocompleteTimer);
+        autocompleteTimer = setTimeout(() => updateSuggestions(input.value.trim(), datalist), 80);
+    });
+}
+
+async function updateSuggestions(prefix, datalist) {
+    if (!prefix) {
+        datalist.innerHTML = '';
+        return;
+    }
+
+    const key = prefix.toLowerCase();
+    let names = autocompleteCache.get(key);
+    if (!names) {
+        try {
+            names = await fetchAPI(`/medicines/autocomplete?prefix=${encodeURIComponent(prefix)}&limit=8`);
+            autocompleteCache.set(key, names);
+        } catch (error) {
+            return;
+        }
+    }
+
+    datalist.innerHTML = names.map(name => `<option value="${name}"></option>`).join('');
+}
+
 // API Functions
-async function searchMedicines() {
+async function searchMedicines(insideWords = false) {
     const query = document.getElementById('searchInput').value;
     if (!query) {
         alert('Please enter a search query');
@@ -245,17 +285,29 @@ async function searchMedicines() {
     }
 
     try {
-        const response = await fetchAPI('/medicines/search', {
-            method: 'POST',
-            body: JSON.stringify({ query, limit: 10 })
-        });
+        // The offline index only matches the start of words; the API also finds matches inside words
+        let medicines = insideWords ? null : await searchMedicinesOffline(query, 10);
+        const answeredOffline = Boolean(medicines && medicines.length);
+        if (!answeredOffline) {
+            const response = await fetchAPI('/medicines/search', {
+                method: 'POST',
+                body: JSON.stringify({ query, limit: 10 })
+            });
+            medicines = response.medicines;
+        }
         
         const medicinesList = document.getElementById('medicinesList');
-        medicinesList.innerHTML = response.medicines.map(med => `
+        const note = answeredOffline ? `
+            <p class="search-note">Showing medicines with a word that starts with your search.
+                <button onclick="searchMedicines(true)">Also match inside words</button></p>
+        ` : '';
+        medicinesList.innerHTML = note + medicines.map(med => `
             <div class="medicine-card">
                 <h3>${med.name}</h3>
                 <p><strong>Generic Name:</strong> ${med.generic_name || 'N/A'}</p>
-                <p><strong>Manufacturer:</strong> ${med.manufacturer || 'N/A'}</p>
+                ${med.manufacturer !== undefined ? `
+                    <p><strong>Manufacturer:</strong> ${med.manufacturer || 'N/A'}</p>
+                ` : ''}
                 <button onclick="viewMedicineDetails('${med.name}')">View Details</button>
             </div>
         `).join('');
@@ -284,6 +336,15 @@ async function viewMedicineDetails(medicineName) {
                 <p><strong>Manufacturer:</strong> ${medicine.manufacturer || 'N/A'}</p>
                 <p><strong>Uses:</strong> ${medicine.uses || 'N/A'}</p>
                 <p><strong>Side Effects:</strong> ${medicine.side_effects || 'N/A'}</p>
+                ${(medicine.references || []).length ? `
+                    <h3>From Wikipedia</h3>
+                    ${medicine.references.map(reference => `
+                        <div class="medicine-card">
+                            <h4>${reference.title}</h4>
+                            <p>${reference.summary}</p>
+                        </div>
+                    `).join('')}
+                ` : ''}
             </div>
         `;
     } catch (error) {
@@ -364,13 +425,30 @@ async function checkInteractions() {
         return;
     }
     
+    const resultsElement = document.getElementById('interactionResults');
+    // Full details come from the API; the offline pre-check shows which pairs interact meanwhile
+    const fullCheck = fetchAPI('/interactions/check', {
+        method: 'POST',
+        body: JSON.stringify({ medicines: selectedMedicines })
+    }).then(response => ({ response }), error => ({ error }));
+    
+    const precheck = await precheckInteractionsOffline(selectedMedicines);
+    if (precheck) {
+        resultsElement.innerHTML = renderInteractionPrecheck(precheck);
+    }
+    
+    const { response, error } = await fullCheck;
+    if (error) {
+        if (precheck) {
+            resultsElement.innerHTML = renderInteractionPrecheck(precheck, false)
+                + '<p>Full interaction details are unavailable right now; showing the offline pre-check.</p>';
+        } else {
+            alert('Error checking interactions');
+        }
+        return;
+    }
+    
     try {
-        const response = await fetchAPI('/interactions/check', {
-            method: 'POST',
-            body: JSON.stringify({ medicines: selectedMedicines })
-        });
-        
-        const resultsElement = document.getElementById('interactionResults');
         resultsElement.innerHTML = `
             <h3>Interaction Results</h3>
             <p><strong>Severity Summary:</strong></p>
@@ -406,6 +484,21 @@ async function checkInteractions() {
     }
 }
 
+function renderInteractionPrecheck(pairs, loading = true) {
+    return `
+        <h3>Interaction Pre-check</h3>
+        ${pairs.length > 0 ? `
+            ${pairs.map(pair => `
+                <div class="medicine-card">
+                    <p><strong>${pair.drug_a} + ${pair.drug_b}</strong></p>
+                    <p><strong>Highest Severity:</strong> ${pair.severity} (${pair.interaction_count} interaction${pair.interaction_count === 1 ? '' : 's'})</p>
+                </div>
+            `).join('')}
+        ` : '<p>No interactions found between the selected medicines.</p>'}
+        ${loading ? '<p>Loading full details...</p>' : ''}
+    `;
+}
+
 // Ask MediGuide Functions
 function renderAskMediGuide() {
     appElement.innerHTML = `
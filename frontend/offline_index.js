@@ -0,0 +1,165 @@
+// Offline search index
+// Loads the static bundle exported by app/services/static_bundle.py: a manifest plus
+// gzip-compressed JSON shards keyed by the first two characters of a word or drug name.
+// Only the shards a lookup needs are fetched, and each is kept for the rest of the session.
+
+const BUNDLE_BASE_URL = `${API_BASE_URL}/static/bundle`;
+
+let bundleManifest = null;
+const bundleShards = new Map();
+
+// Must match shard_key() in app/services/static_bundle.py
+function bundleShardKey(text, length) {
+    const prefix = text.toLowerCase().slice(0, length).padEnd(length, '_');
+    return Array.from(prefix, c => (/[a-z0-9]/.test(c) ? c : '_')).join('');
+}
+
+async function loadBundleManifest() {
+    if (!bundleManifest) {
+        bundleManifest = (async () => {
+            // Without DecompressionStream the shards cannot be read; callers fall back to the API
+            if (typeof DecompressionStream === 'undefined') {
+                return null;
+            }
+            const response = await fetch(`${BUNDLE_BASE_URL}/manifest.json`, { cache: 'no-cache' });
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return response.json();
+        })().catch(error => {
+            console.warn('Offline index unavailable:', error);
+            bundleManifest = null;
+            return null;
+        });
+    }
+    return bundleManifest;
+}
+
+async function loadBundleShard(kind, key) {
+    const manifest = await loadBundleManifest();
+    if (!manifest) {
+        return null;
+    }
+    const path = manifest[kind][key];
+    if (!path) {
+        // No shard means nothing in the dataset starts with these characters
+        return kind === 'medicines' ? [] : {};
+    }
+    if (!bundleShards.has(path)) {
+        bundleShards.set(path, (async () => {
+            // Shard paths contain the dataset version, so the browser may cache them indefinitely
+            const response = await fetch(`${BUNDLE_BASE_URL}/${path}`);
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            const stream = response.body.pipeThrough(new DecompressionStream('gzip'));
+            return new Response(stream).json();
+        })().catch(error => {
+            bundleShards.delete(path);
+            throw error;
+        }));
+    }
+    return bundleShards.get(path);
+}
+
+// Medicines with a word in their name or composition that starts with the query, in catalogue
+// order. The shard of the query's first two characters holds every such medicine, so these
+// results are complete; matches inside a word are only found by the API's substring search.
+// Returns null when the bundle cannot answer, so the caller should ask the API.
+async function searchMedicinesOffline(query, limit = 10) {
+    const needle = query.trim().toLowerCase();
+    const firstWord = (needle.match(/^[a-z0-9]+/) || [''])[0];
+    const manifest = await loadBundleManifest();
+    if (!manifest || firstWord.length < manifest.shard_key_length) {
+        return null;
+    }
+
+    const escaped = needle.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+    const wordStart = new RegExp(`(^|[^a-z0-9])${escaped}`);
+    try {
+        const entries = await loadBundleShard('medicines', bundleShardKey(firstWord, manifest.shard_key_length));
+        const results = [];
+        for (const [row, name, composition] of entries) {
+            if (wordStart.test(name.toLowerCase()) || wordStart.test(composition.toLowerCase())) {
+                results.push({ row, name, generic_name: composition });
+                if (results.length >= limit) {
+                    break;
+                }
+            }
+        }
+        return results;
+    } catch (error) {
+        console.warn('Offline search failed:', error);
+        return null;
+    }
+}
+
+// Must match parse_ingredients() in app/services/medicine_store.py
+function parseIngredients(composition) {
+    const ingredients = composition.replace(/\([^)]*\)/g, '').split('+')
+        .map(part => part.split(/\s+/).filter(Boolean).join(' ').toLowerCase())
+        .filter(Boolean);
+    return [...new Set(ingredients)];
+}
+
+// Interaction drugs behind a name, as /interactions/check resolves them: the drug itself,
+// or the ingredients of the medicine brand with that name
+async function resolveDrugsOffline(name, manifest) {
+    const drug = name.trim().toLowerCase();
+    const shard = await loadBundleShard('interactions', bundleShardKey(drug, manifest.shard_key_length));
+    if (shard[drug]) {
+        return [[drug, shard[drug]]];
+    }
+    const firstWord = (drug.match(/[a-z0-9]+/) || [''])[0];
+    const medicines = await loadBundleShard('medicines', bundleShardKey(firstWord, manifest.shard_key_length));
+    const medicine = medicines.find(([, medicineName]) => medicineName.toLowerCase() === drug);
+    if (!medicine) {
+        return [];
+    }
+    const ingredients = parseIngredients(medicine[2]);
+    const shards = await Promise.all(ingredients.map(
+        ingredient => loadBundleShard('interactions', bundleShardKey(ingredient, manifest.shard_key_length))
+    ));
+    return ingredients.map((ingredient, i) => [ingredient, shards[i][ingredient] || []]);
+}
+
+// Interacting pairs among the given drug or medicine names, with their highest severity and how
+// many interactions each pair has. Descriptions are not in the bundle; fetch those from the API.
+// Returns null when the bundle cannot answer.
+async function precheckInteractionsOffline(names) {
+    const manifest = await loadBundleManifest();
+    if (!manifest) {
+        return null;
+    }
+
+    try {
+        const entries = await Promise.all(names.map(name => resolveDrugsOffline(name, manifest)));
+        const label = (name, drug) => (name.trim().toLowerCase() === drug ? name : `${name} (${drug})`);
+        const pairs = [];
+        const seen = new Set();
+        entries.forEach((drugs, i) => {
+            for (const [drug, partnerList] of drugs) {
+                const partners = new Map(partnerList.map(([partner, code, count]) => [partner, [code, count]]));
+                for (let j = i + 1; j < entries.length; j++) {
+                    for (const [other] of entries[j]) {
+                        const match = partners.get(other);
+                        const key = [drug, other].sort().join('\u0000');
+                        if (match && other !== drug && !seen.has(key)) {
+                            seen.add(key);
+                            pairs.push({
+                                drug_a: label(names[i], drug),
+                                drug_b: label(names[j], other),
+                                severity: manifest.severity_levels[match[0]],
+                                interaction_count: match[1]
+                            });
+                        }
+                    }
+                }
+            }
+        });
+        return pairs;
+    } catch (error) {
+        console.warn('Offline interaction pre-check failed:', error);
+        return null;
+    }
+}
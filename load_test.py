@@ -0,0 +1,274 @@
+"""
+Load test for the MediGuide API with a mixed traffic profile
+
+Drives app.main:app in-process through httpx's ASGI transport, or a running
+server with --url, at one or more concurrency levels. Reports throughput,
+p50/p95/p99 latency per request kind, and event-loop lag measured while the
+load runs: in-process the app shares the test's event loop, so any handler
+that blocks the loop shows up directly as lag.
+
+    python load_test.py --concurrency 1,8,32 --duration 10
+    python load_test.py --url http://127.0.0.1:8000 --mix search=50,detail=30,check=20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import httpx
+import numpy as np
+
+from app.services.medicine_store import parse_ingredients
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIX = "search=40,detail=25,check=25,ask=10"
+# Loop lag above this during a run means some handler held the event loop
+LAG_WARNING_MS = 20.0
+
+QUESTIONS = [
+    "I have a headache and fever, what should I take?",
+    "What can I do about a dry cough at night?",
+    "My stomach hurts after eating, is that acidity?",
+    "How should I treat a minor burn?",
+    "What helps with seasonal allergies and a runny nose?",
+    "How much water should I drink each day?",
+    "Is it safe to exercise with a mild cold?",
+    "What are common side effects of antibiotics?",
+]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for item in spec.split(","):
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in ("search", "detail", "check", "ask"):
+            raise ValueError(f"Unknown request kind in mix: {kind}")
+        mix[kind] = float(weight)
+    return mix
+
+
+class TrafficProfile:
+    """Builds requests from medicines sampled from the running API
+
+    Searches and details use brand names; interaction checks use the ingredients
+    of those medicines, the drug names the interaction data is keyed by.
+    """
+
+    def __init__(self, medicines: List[Dict], mix: Dict[str, float], seed: int = 0):
+        if not medicines:
+            raise RuntimeError("The API returned no medicines to build requests from")
+        self.names = [medicine["name"] for medicine in medicines]
+        self.drugs = sorted({ingredient for medicine in medicines
+                             for ingredient in parse_ingredients(medicine.get("generic_name") or "")})
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.random = random.Random(seed)
+
+    def next_request(self):
+        """(kind, method, path, JSON body or None) for one request"""
+        kind = self.random.choices(self.kinds, self.weights)[0]
+        name = self.random.choice(self.names)
+        if kind == "search":
+            # Users type part of a brand name
+            word = name.split()[0]
+            return kind, "POST", "/medicines/search", {"query": word[:self.random.randint(3, max(3, len(word)))],
+                                                        "limit": 10}
+        if kind == "detail":
+            return kind, "GET", f"/medicines/{quote(name, safe='')}", None
+        if kind == "check":
+            drugs = self.drugs or self.names
+            regimen = self.random.sample(drugs, min(len(drugs), self.random.randint(2, 5)))
+            return kind, "POST", "/interactions/check", {"medicines": regimen, "sort_by_severity": True}
+        return kind, "POST", "/ask-mediguide", {"question": self.random.choice(QUESTIONS)}
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic sleep wakes up, which is how long something else held the loop
+
+    With a remote server the test's own loop is mostly idle, so each tick
+    instead times a request to the trivial `/` endpoint; its latency rises when
+    the server's loop is blocked.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, remote: bool, interval: float = 0.01):
+        self.client = client
+        self.remote = remote
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            if self.remote:
+                await self.client.get("/")
+                self.lags.append(time.perf_counter() - started)
+                await asyncio.sleep(self.interval)
+            else:
+                await asyncio.sleep(self.interval)
+                self.lags.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, httpx.HTTPError):
+            pass
+
+
+def _percentiles_ms(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+    return {"p50": round(p50, 2), "p95": round(p95, 2), "p99": round(p99, 2), "max": round(max(values) * 1000, 2)}
+
+
+async def run_level(client: httpx.AsyncClient, profile: TrafficProfile, concurrency: int, duration: float,
+                    remote: bool) -> Dict:
+    """Closed-loop run: `concurrency` workers each send their next request as soon as the last returns"""
+    latencies: Dict[str, List[float]] = {kind: [] for kind in profile.kinds}
+    statuses: Dict[str, int] = {}
+    # Checks that found an interaction, so the lookup itself was measured and not only the empty path
+    checks_with_interactions = 0
+    monitor = LoopLagMonitor(client, remote)
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal checks_with_interactions
+        while time.perf_counter() < deadline:
+            kind, method, path, body = profile.next_request()
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                status = str(response.status_code)
+                if kind == "check" and response.status_code == 200 and response.json().get("interactions"):
+                    checks_with_interactions += 1
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies[kind].append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            # In-process, a handler that never awaits real I/O completes without yielding the loop;
+            # yield here so the lag monitor and the other workers get their turn between requests
+            await asyncio.sleep(0)
+
+    monitor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await monitor.stop()
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 1),
+        "statuses": statuses,
+        "checks": len(latencies.get("check", [])),
+        "checks_with_interactions": checks_with_interactions,
+        "latency_ms": _percentiles_ms([value for values in latencies.values() for value in values]),
+        "latency_ms_by_kind": {kind: _percentiles_ms(values) for kind, values in latencies.items() if values},
+        "loop_lag_ms": _percentiles_ms(monitor.lags),
+    }
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 600.0):
+    """Wait for /ready and for background loading to finish, which would otherwise compete for the CPU"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            response = await client.get("/ready")
+            subsystems = response.json().get("subsystems", {})
+            if response.status_code == 200 and not any(info.get("state") == "loading"
+                                                       for info in subsystems.values()):
+                not_ready = [name for name, info in subsystems.items() if info.get("state") != "ready"]
+                if not_ready:
+                    print(f"Not loaded, requests that need them may fail: {', '.join(not_ready)}")
+                return
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("API did not become ready")
+        await asyncio.sleep(0.5)
+
+
+def print_report(result: Dict, remote: bool):
+    print(f"\nconcurrency {result['concurrency']}: {result['requests']} requests in {result['seconds']} s, "
+          f"{result['throughput_rps']} req/s, statuses {result['statuses']}")
+    print(f"  {'kind':<8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for kind, stats in [("all", result["latency_ms"])] + list(result["latency_ms_by_kind"].items()):
+        print(f"  {kind:<8} {stats['p50']:>9} {stats['p95']:>9} {stats['p99']:>9} {stats['max']:>9}")
+    if result["checks"]:
+        print(f"  {result['checks_with_interactions']} of {result['checks']} interaction checks found an interaction")
+    lag = result["loop_lag_ms"]
+    label = "probe latency" if remote else "loop lag"
+    print(f"  {label:<14} p50 {lag['p50']} ms, p99 {lag['p99']} ms, max {lag['max']} ms")
+    if not remote and lag["max"] > LAG_WARNING_MS:
+        print(f"  WARNING: the event loop was blocked for up to {lag['max']} ms; "
+              "some async handler does blocking work on the loop")
+
+
+async def run(args) -> List[Dict]:
+    mix = parse_mix(args.mix)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                   limits=httpx.Limits(max_connections=max(args.concurrency) + 1))
+        lifespan = None
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                   timeout=args.timeout)
+        # ASGITransport does not send lifespan events, so run startup and shutdown here
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+
+    results = []
+    try:
+        await wait_until_ready(client)
+        medicines = (await client.get("/medicines", params={"limit": args.names})).json()
+        profile = TrafficProfile(medicines, mix, args.seed)
+        if args.warmup:
+            await run_level(client, profile, max(args.concurrency), args.warmup, bool(args.url))
+        for concurrency in args.concurrency:
+            result = await run_level(client, profile, concurrency, args.duration, bool(args.url))
+            print_report(result, bool(args.url))
+            results.append(result)
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+    return results
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description="Load test the MediGuide API with mixed traffic")
+    parser.add_argument("--url", help="Base URL of a running server; by default the app runs in-process")
+    parser.add_argument("--concurrency", type=lambda s: [int(n) for n in s.split(",")], default=[1, 8, 32],
+                        help="Comma-separated concurrency levels, run one after another")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of unreported load first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weights of search, detail, check and ask requests")
+    parser.add_argument("--names", type=int, default=1000, help="Medicine names to draw requests from")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=str, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import pandas as pd
+
+from app.models.drug_model import AlternativesRequest
+from app.services.alternative_service import AlternativeService
+from app.services.data_loader import DataLoader
+from app.services.interaction_store import InteractionStore
+from app.services.medicine_store import MedicineStore
+
+MEDICINES = [
+    ("Crocin 500", "Paracetamol (500mg)", "Pain relief", "40"),
+    ("Ecosprin 75", "Aspirin (75mg)", "Pain relief", "90"),
+    ("Disprin", "Aspirin (325mg)", "Pain relief", "80"),
+    ("Brufen 400", "Ibuprofen (400mg)", "Pain relief", "50"),
+    ("Dolo 650", "Paracetamol (650mg)", "Fever", "70"),
+]
+INTERACTIONS = [
+    ("Ibuprofen", "Aspirin",
+     "The risk or severity of bleeding can be increased when Ibuprofen is combined with Aspirin."),
+    ("Paracetamol", "Warfarin", "Paracetamol may increase the anticoagulant activities of Warfarin."),
+]
+
+
+def build_service() -> AlternativeService:
+    loader = DataLoader()
+    loader.medicines = MedicineStore.from_frame(pd.DataFrame(
+        MEDICINES, columns=["Medicine Name", "Composition", "Uses", "Excellent Review %"]
+    ))
+    loader.drug_interactions = InteractionStore.from_frame(pd.DataFrame(
+        INTERACTIONS, columns=["Drug 1", "Drug 2", "Interaction Description"]
+    ))
+    service = AlternativeService()
+    service.data_loader = loader
+    service.build()
+    return service
+
+
+def test_same_composition_ranks_first():
+    service = build_service()
+    response = service.find_alternatives(AlternativesRequest(medicines=["Crocin 500"], replace="Crocin 500"))
+    assert [alternative.name for alternative in response.alternatives][0] == "Dolo 650"
+    assert response.alternatives[0].match == "composition"
+
+
+def test_ingredients_already_in_regimen_are_not_suggested():
+    service = build_service()
+    response = service.find_alternatives(AlternativesRequest(
+        medicines=["Ecosprin 75", "Crocin 500"], replace="Crocin 500"
+    ))
+    names = [alternative.name for alternative in response.alternatives]
+    assert "Disprin" not in names
+    assert names == ["Dolo 650", "Brufen 400"]
+    assert response.alternatives[1].conflicting_with == ["Ecosprin 75"]
@@ -0,0 +1,105 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from app.models.llm_backends import StubBackend
+from app.services.llm_scheduler import BatchScheduler, DeadlineExceededError, QueueFullError
+
+
+class ShortBackend(StubBackend):
+    """Drops the last answer of every batch"""
+
+    def generate_batch(self, prompts: List[str], max_new_tokens: int = 256) -> List[str]:
+        return super().generate_batch(prompts, max_new_tokens)[:-1]
+
+
+def run(scheduler: BatchScheduler, coroutine_factory):
+    async def main():
+        scheduler.start()
+        try:
+            return await coroutine_factory()
+        finally:
+            await scheduler.stop()
+    return asyncio.run(main())
+
+
+def test_concurrent_prompts_share_one_batch():
+    backend = StubBackend(latency_ms=5)
+    scheduler = BatchScheduler(lambda: backend, window_ms=50)
+    prompts = [f"question {i}" for i in range(5)]
+
+    answers = run(scheduler, lambda: asyncio.gather(*(scheduler.submit(prompt) for prompt in prompts)))
+
+    assert answers == backend.generate_batch(prompts)
+    assert scheduler.stats()["batches"] == 1
+    assert scheduler.stats()["mean_batch_size"] == 5
+
+
+def test_scheduler_restarts_after_stop():
+    backend = StubBackend(latency_ms=1)
+    scheduler = BatchScheduler(lambda: backend, window_ms=5)
+
+    # Two lifespans in one process, as with a second TestClient
+    first = run(scheduler, lambda: scheduler.submit("before"))
+    second = run(scheduler, lambda: scheduler.submit("after"))
+
+    assert [first, second] == backend.generate_batch(["before", "after"])
+    assert scheduler.stats()["batches"] == 2
+
+
+def test_batches_are_capped_at_max_batch_size():
+    backend = StubBackend(latency_ms=1)
+    backend.max_batch_size = 2
+    scheduler = BatchScheduler(lambda: backend, window_ms=50)
+
+    run(scheduler, lambda: asyncio.gather(*(scheduler.submit(f"q{i}") for i in range(5))))
+
+    assert scheduler.stats()["batches"] == 3
+    assert scheduler.stats()["prompts"] == 5
+
+
+def test_full_queue_rejects_without_waiting():
+    backend = StubBackend(latency_ms=1)
+    scheduler = BatchScheduler(lambda: backend, window_ms=10, max_queue=2)
+
+    # All three submit before the worker runs, so the third finds the queue full
+    results = run(scheduler, lambda: asyncio.gather(*(scheduler.submit(f"q{i}") for i in range(3)),
+                                                    return_exceptions=True))
+
+    assert [type(result) for result in results].count(QueueFullError) == 1
+    assert scheduler.stats()["rejected"] == 1
+
+
+def test_prompt_past_its_deadline_raises():
+    backend = StubBackend(latency_ms=300)
+    scheduler = BatchScheduler(lambda: backend, window_ms=1)
+
+    with pytest.raises(DeadlineExceededError):
+        run(scheduler, lambda: scheduler.submit("slow question", timeout=0.05))
+    assert scheduler.stats()["expired"] == 1
+
+
+def test_missing_answers_fail_instead_of_timing_out():
+    backend = ShortBackend(latency_ms=1)
+    scheduler = BatchScheduler(lambda: backend, window_ms=50)
+    prompts = ["a", "b", "c"]
+
+    async def submit_all():
+        return await asyncio.wait_for(
+            asyncio.gather(*(scheduler.submit(prompt, timeout=10) for prompt in prompts), return_exceptions=True),
+            timeout=2
+        )
+
+    results = run(scheduler, submit_all)
+
+    assert results[:2] == StubBackend(latency_ms=0).generate_batch(prompts[:2])
+    assert isinstance(results[2], RuntimeError) and not isinstance(results[2], DeadlineExceededError)
+    assert scheduler.stats()["failed"] == 1
+
+
+def test_no_backend_fails_fast():
+    scheduler = BatchScheduler(lambda: None, window_ms=1)
+
+    with pytest.raises(RuntimeError, match="no LLM backend"):
+        run(scheduler, lambda: scheduler.submit("anything", timeout=2))
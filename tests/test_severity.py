@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from app.services.severity import SEVERITY_LEVELS, classify_severity
+
+# One description per template of db_drug_interactions.csv, with the level it should get
+TEMPLATES = [
+    ("Aspirin may increase the anticoagulant activities of Warfarin.", "high"),
+    ("Aspirin may decrease the anticoagulant activities of Warfarin.", "low"),
+    ("The risk or severity of bleeding can be increased when Aspirin is combined with Warfarin.", "high"),
+    ("Cetirizine may increase the QTc-prolonging activities of Omeprazole.", "high"),
+    ("Ibuprofen may decrease the antihypertensive activities of Metformin.", "low"),
+    ("Ibuprofen may increase the hypertensive activities of Metformin.", "moderate"),
+    ("The risk or severity of adverse effects can be increased when Metformin is combined with Aspirin.",
+     "moderate"),
+    ("The serum concentration of Warfarin can be increased when it is combined with Omeprazole.", "moderate"),
+    ("The metabolism of Atorvastatin can be decreased when combined with Clavulanic Acid.", "moderate"),
+    ("The therapeutic efficacy of Metformin can be decreased when used in combination with Paracetamol.",
+     "moderate"),
+    ("Omeprazole can cause a decrease in the absorption of Metformin resulting in a reduced serum "
+     "concentration and potentially a decrease in efficacy.", "low"),
+    ("Amoxicillin may increase the photosensitizing activities of Atorvastatin.", "low"),
+    ("Ibuprofen may increase the cardiotoxic activities of Cetirizine.", "high"),
+    ("Ibuprofen may decrease the cardiotoxic activities of Cetirizine.", "low"),
+    ("Amoxicillin may increase the neuromuscular blocking activities of Atorvastatin.", "high"),
+    ("Amoxicillin may decrease the neuromuscular blocking activities of Atorvastatin.", "low"),
+    ("Cetirizine may increase the central nervous system depressant (CNS depressant) activities of "
+     "Paracetamol.", "high"),
+    ("Cetirizine may decrease the central nervous system depressant (CNS depressant) activities of "
+     "Paracetamol.", "low"),
+    ("Ibuprofen may increase the nephrotoxic activities of Metformin.", "high"),
+    ("Ibuprofen may decrease the nephrotoxic activities of Metformin.", "low"),
+    ("Metformin may increase the hypotensive activities of Omeprazole.", "moderate"),
+    ("Metformin may decrease the hypotensive activities of Omeprazole.", "low"),
+    ("The risk or severity of QTc prolongation can be increased when Cetirizine is combined with Omeprazole.",
+     "high"),
+    ("The risk or severity of nephrotoxicity can be increased when Ibuprofen is combined with Metformin.",
+     "high"),
+    ("Amoxicillin and Paracetamol have no known interaction text pattern.", "unknown"),
+]
+
+
+@pytest.mark.parametrize("description,level", TEMPLATES)
+def test_template_severity(description, level):
+    code = classify_severity(pd.Series([description]))[0]
+    assert SEVERITY_LEVELS[code] == level